@@ -0,0 +1,191 @@
+"""Análise offline (sem interface gráfica) de vídeos gravados.
+
+Roda a mesma lógica do modo ao vivo (FaceDetector + DrowsinessMonitor +
+EventLogger) sobre arquivos de vídeo, em paralelo num pool de processos.
+Vídeos longos são divididos em blocos e os eventos usam o tempo do vídeo
+(índice do frame / FPS), então o resultado não depende do relógio. O
+session_id de cada vídeo é o seu caminho relativo à raiz comum das entradas
+(ex.: 'motorista1/viagem'), então vídeos de mesmo nome não se misturam.
+
+Exemplo:
+    python analyze_videos.py gravacoes/ --ear-threshold 0.22 --workers 8
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+
+import cv2
+
+from modules.analyzer.drowsiness_monitor import DrowsinessMonitor
+from modules.analyzer.event_logger import EventLogger
+from modules.detector import model_registry
+from modules.detector.face_detector import FaceDetector
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".m4v")
+OUTPUT_HEADERS = ['session_id', 'timestamp', 'event_type', 'metric_value', 'frame_index']
+
+# Instância por processo, criada no inicializador do pool (os modelos vêm do registro)
+_face_detector = None
+
+
+def find_videos(paths):
+    """Expande arquivos e diretórios (recursivamente) numa lista ordenada de vídeos."""
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                videos.extend(os.path.join(root, name) for name in files
+                              if name.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            videos.append(path)
+    return sorted(videos)
+
+
+def session_ids(videos, paths):
+    """session_id de cada vídeo: caminho relativo à raiz comum das entradas, sem extensão."""
+    roots = [os.path.abspath(path if os.path.isdir(path) else os.path.dirname(path) or ".") for path in paths]
+    root = os.path.commonpath(roots) if roots else os.getcwd()
+    return {
+        video: os.path.splitext(os.path.relpath(os.path.abspath(video), root))[0].replace(os.sep, "/")
+        for video in videos
+    }
+
+
+def plan_chunks(video_path, session_id, chunk_seconds, warmup_seconds):
+    """Divide um vídeo em blocos (start, end) de frames, com um aquecimento antes de cada um.
+
+    O aquecimento reprocessa alguns segundos anteriores ao bloco para que os
+    temporizadores de olhos/boca cheguem ao início do bloco no estado da
+    passada única; se ele não bastar, analyze_chunk o estende.
+    """
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    if total_frames <= 0:
+        return []
+
+    chunk_frames = max(1, int(chunk_seconds * fps))
+    warmup_frames = int(warmup_seconds * fps)
+    return [
+        (video_path, session_id, fps, start, min(start + chunk_frames, total_frames), max(0, start - warmup_frames))
+        for start in range(0, total_frames, chunk_frames)
+    ]
+
+
+def _init_worker():
+    global _face_detector
+    _face_detector = FaceDetector()
+
+
+def analyze_chunk(task, ear_threshold, mar_threshold, eye_closed_threshold, mouth_open_threshold):
+    """Processa um bloco de frames e retorna as linhas de eventos que caem dentro dele.
+
+    Os temporizadores no início do bloco só dependem dos frames desde o último
+    em que nenhum estava correndo (olhos abertos e boca fechada). Se o
+    aquecimento não tiver um frame assim (ex.: olhos fechados por mais tempo
+    que ele), o bloco é refeito com o aquecimento dobrado, até o início do vídeo.
+    """
+    video_path, session_id, fps, start_frame, end_frame, warmup_frame = task
+    while True:
+        rows, settled = _run_chunk(video_path, session_id, fps, start_frame, end_frame, warmup_frame,
+                                   ear_threshold, mar_threshold, eye_closed_threshold, mouth_open_threshold)
+        if settled or warmup_frame == 0:
+            return rows
+        warmup_frame = max(0, start_frame - 2 * (start_frame - warmup_frame))
+
+
+def _run_chunk(video_path, session_id, fps, start_frame, end_frame, warmup_frame,
+               ear_threshold, mar_threshold, eye_closed_threshold, mouth_open_threshold):
+    """Retorna (linhas do bloco, se o aquecimento passou por um frame sem temporizador correndo)."""
+    # Eventos só em memória: quem escreve o resultado é o processo principal
+    event_logger = EventLogger(session_id, ear_threshold, mar_threshold, csv_path=None, db_path=None, live=False)
+    monitor = DrowsinessMonitor(event_logger, eye_closed_threshold, mouth_open_threshold)
+    _face_detector.reset_tracking()
+
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, warmup_frame)
+    rows = []
+    settled = warmup_frame == start_frame
+    frame_index = warmup_frame
+    while frame_index < end_frame:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        timestamp = frame_index / fps
+        fired = False
+        for measurement, _, triggered in monitor.process(_face_detector.analyze(frame), timestamp):
+            fired = fired or bool(triggered)
+            for event_type in triggered:
+                # Eventos do aquecimento pertencem ao bloco anterior
+                if frame_index >= start_frame:
+                    metric_value = measurement.ear if event_type == "olhos" else measurement.mar
+                    rows.append([session_id, timestamp, event_type, metric_value, frame_index])
+        # Um evento também zera o temporizador, mas o instante dele depende do histórico
+        if frame_index < start_frame and not settled and not fired:
+            settled = not monitor.has_pending_event()
+        frame_index += 1
+    cap.release()
+    event_logger.close()
+    return rows, settled
+
+
+def _analyze_chunk_star(args):
+    return analyze_chunk(*args)
+
+
+def analyze_videos(paths, ear_threshold=0.25, mar_threshold=0.5, eye_closed_threshold=2.0,
+                   mouth_open_threshold=2.0, chunk_seconds=300.0, workers=None):
+    """Analisa os vídeos em paralelo e retorna as linhas de eventos ordenadas por sessão e tempo."""
+    warmup_seconds = max(eye_closed_threshold, mouth_open_threshold) + 1.0
+    videos = find_videos(paths)
+    ids = session_ids(videos, paths)
+    tasks = []
+    for video_path in videos:
+        tasks.extend(plan_chunks(video_path, ids[video_path], chunk_seconds, warmup_seconds))
+
+    args = [(task, ear_threshold, mar_threshold, eye_closed_threshold, mouth_open_threshold)
+            for task in tasks]
+    # Carrega os modelos no processo pai: com fork os workers os herdam por copy-on-write
+    model_registry.preload()
+    rows = []
+    with multiprocessing.Pool(workers or os.cpu_count(), initializer=_init_worker) as pool:
+        for chunk_rows in pool.imap_unordered(_analyze_chunk_star, args):
+            rows.extend(chunk_rows)
+
+    rows.sort(key=lambda row: (row[0], row[1], row[2]))
+    return rows
+
+
+def write_events(rows, output_path):
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(OUTPUT_HEADERS)
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Análise offline de sonolência em vídeos gravados.")
+    parser.add_argument("paths", nargs="+", help="Arquivos de vídeo ou diretórios")
+    parser.add_argument("--ear-threshold", type=float, default=0.25)
+    parser.add_argument("--mar-threshold", type=float, default=0.5)
+    parser.add_argument("--eye-closed-seconds", type=float, default=2.0)
+    parser.add_argument("--mouth-open-seconds", type=float, default=2.0)
+    parser.add_argument("--chunk-seconds", type=float, default=300.0,
+                        help="Duração de cada bloco de vídeo processado por um worker")
+    parser.add_argument("--workers", type=int, default=None, help="Processos (padrão: número de núcleos)")
+    parser.add_argument("--output", default=os.path.join("reports", "offline_events.csv"))
+    args = parser.parse_args()
+
+    rows = analyze_videos(args.paths, args.ear_threshold, args.mar_threshold,
+                          args.eye_closed_seconds, args.mouth_open_seconds,
+                          args.chunk_seconds, args.workers)
+    write_events(rows, args.output)
+    print(f"{len(rows)} eventos gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""Benchmark do caminho crítico de detecção, sem webcam nem display.
+
+Mede cada estágio (escala de cinza, detecção HOG, landmarks, EAR/MAR,
+desenho, registro de eventos, monitor e calibração) sobre frames sintéticos
+ou gravados e imprime JSON com vazão, latências p50/p99 e pico de memória,
+para comparar execuções antes e depois de uma otimização.
+
+Exemplo (da raiz do projeto):
+    python -m benchmarks.bench_hot_path --frames 200 --output reports/bench.json
+    python -m benchmarks.bench_hot_path --video gravacao.mp4 --width 1280
+
+Estágios que dependem do dlib ou do modelo de landmarks são marcados como
+'skipped' quando eles não estão disponíveis. O pico de memória vem do
+tracemalloc: inclui alocações Python e NumPy, não as internas do dlib.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from benchmarks.fixtures import recorded_frames, synthetic_frames, synthetic_landmarks
+from modules.analyzer.drowsiness_monitor import DrowsinessMonitor
+from modules.analyzer.event_logger import EventLogger
+from modules.analyzer.event_sinks import AsyncEventWriter, CsvEventSink
+from modules.analyzer.replay import BoxRect
+from modules.calibrator.calibrator import Calibrator
+from modules.detector import model_registry
+from modules.detector.landmarks import FaceMeasurement, average_ear, eye_aspect_ratios, mouth_aspect_ratio
+
+
+def measure(fn, inputs, memory_samples=50, items_per_call=1, factory=None):
+    """Executa 'fn' sobre cada entrada e resume latência, vazão e pico de memória.
+
+    Estágios com estado (EventLogger, DrowsinessMonitor...) passam 'factory'
+    no lugar de 'fn': ela retorna (fn, close) com instâncias novas e é chamada
+    de novo para a passada de memória, que assim recebe os timestamps em
+    ordem a partir de um estado limpo, como na passada de tempo.
+    """
+    close = None
+    if factory is not None:
+        fn, close = factory()
+    durations = np.empty(len(inputs), dtype=np.float64)
+    for i, item in enumerate(inputs):
+        start = time.perf_counter()
+        fn(item)
+        durations[i] = time.perf_counter() - start
+    if close is not None:
+        close()
+
+    if factory is not None:
+        fn, close = factory()
+    # Passada separada para memória: o tracemalloc distorce o tempo
+    tracemalloc.start()
+    for item in inputs[:memory_samples]:
+        fn(item)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if close is not None:
+        close()
+
+    total = durations.sum()
+    return {
+        "iterations": len(inputs),
+        "items_per_call": items_per_call,
+        "throughput_per_s": (len(inputs) * items_per_call / total) if total > 0 else None,
+        "mean_ms": float(durations.mean() * 1000.0),
+        "p50_ms": float(np.percentile(durations, 50) * 1000.0),
+        "p99_ms": float(np.percentile(durations, 99) * 1000.0),
+        "peak_memory_kb": peak / 1024.0,
+    }
+
+
+def skipped(reason):
+    return {"skipped": reason}
+
+
+def bench_detector(frames, grays, face_rect):
+    """Estágios que dependem do dlib: HOG no frame inteiro, ROI e predição de landmarks."""
+    results = {}
+    try:
+        detector = model_registry.get_face_detector()
+    except ImportError as e:
+        reason = f"dlib indisponível: {e}"
+        return {"hog_detect": skipped(reason), "shape_predict": skipped(reason), "track_faces": skipped(reason)}
+
+    results["hog_detect"] = measure(detector, grays)
+
+    try:
+        predictor = model_registry.get_shape_predictor()
+    except FileNotFoundError as e:
+        results["shape_predict"] = skipped(str(e))
+        results["track_faces"] = skipped(str(e))
+        return results
+
+    import dlib
+    rect = dlib.rectangle(*face_rect)
+    results["shape_predict"] = measure(lambda gray: predictor(gray, rect), grays)
+
+    from modules.detector.face_detector import FaceDetector
+    face_detector = FaceDetector()
+    results["track_faces"] = measure(lambda frame: face_detector.track_faces(frame), frames)
+    results["analyze"] = measure(face_detector.analyze, frames)
+    return results
+
+
+def bench_metrics(landmarks):
+    results = {
+        "ear_mar": measure(lambda points: (eye_aspect_ratios(points).mean(), mouth_aspect_ratio(points)),
+                           list(landmarks)),
+    }
+    batches = np.array_split(landmarks, max(1, len(landmarks) // 256))
+    results["ear_mar_batch"] = measure(lambda batch: (average_ear(batch), mouth_aspect_ratio(batch)),
+                                       batches, items_per_call=len(batches[0]))
+    return results
+
+
+def bench_drawing(frames, landmarks, face_rect):
+    def draw(i):
+        frame = frames[i % len(frames)]
+        cv2.rectangle(frame, face_rect[:2], face_rect[2:], (0, 255, 0), 2)
+        for x_point, y_point in landmarks[i]:
+            cv2.circle(frame, (int(x_point), int(y_point)), 1, (255, 0, 0), -1)
+    return measure(draw, list(range(len(landmarks))))
+
+
+def bench_event_logging(count):
+    results = {}
+    timestamps = list(np.arange(count, dtype=np.float64) * 0.5)
+
+    def in_memory():
+        logger = EventLogger("bench", csv_path=None, db_path=None)
+        def log_and_evaluate(timestamp):
+            logger.add_event("olhos", timestamp, 0.1)
+            logger.evaluate_risk(current_time=timestamp)
+        return log_and_evaluate, logger.close
+    results["event_logger_memory"] = measure(None, timestamps, factory=in_memory)
+
+    # Custo visto pela thread de detecção com o destino em disco (só enfileira)
+    with tempfile.TemporaryDirectory() as directory:
+        def async_csv():
+            logger = EventLogger("bench", csv_path=None, db_path=None,
+                                 sink=AsyncEventWriter(CsvEventSink(os.path.join(directory, "events.csv"))))
+            return (lambda t: logger.add_event("olhos", t, 0.1)), logger.close
+        results["event_logger_async_csv"] = measure(None, timestamps, factory=async_csv)
+    return results
+
+
+def bench_monitor(landmarks, face_rect):
+    rect = BoxRect(*face_rect)
+    ears = average_ear(landmarks)
+    mars = mouth_aspect_ratio(landmarks)
+    packets = [(i / 30.0, [FaceMeasurement(rect, landmarks[i], float(ears[i]), float(mars[i]))])
+               for i in range(len(landmarks))]
+
+    def new_monitor():
+        logger = EventLogger("bench", 0.2, 0.5, csv_path=None, db_path=None)
+        monitor = DrowsinessMonitor(logger)
+        def step(packet):
+            timestamp, measurements = packet
+            monitor.process(measurements, timestamp)
+            monitor.is_at_risk(timestamp)
+        return step, logger.close
+    return measure(None, packets, factory=new_monitor)
+
+
+def bench_calibrator(landmarks):
+    ears = average_ear(landmarks)
+    mars = mouth_aspect_ratio(landmarks)
+    samples = list(zip(ears.tolist(), mars.tolist()))
+
+    def empty_calibrator():
+        calibrator = Calibrator()
+        return (lambda sample: calibrator.add_sample(*sample)), None
+
+    calibrator = Calibrator()
+    for sample in samples:
+        calibrator.add_sample(*sample)
+    return {
+        "calibrator_add_sample": measure(None, samples, factory=empty_calibrator),
+        "calibrator_thresholds": measure(lambda _: calibrator.calculate_thresholds(), list(range(100))),
+    }
+
+
+def run(frame_count=100, landmark_count=5000, width=1280, height=720, video=None):
+    if video:
+        frames = recorded_frames(video, frame_count, width)
+    else:
+        frames = synthetic_frames(frame_count, width, height)
+    height, width = frames[0].shape[:2]
+    face_rect = (width // 2 - 100, height // 2 - 100, width // 2 + 100, height // 2 + 100)
+    landmarks = synthetic_landmarks(landmark_count)
+
+    stages = {"grayscale": measure(lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), frames)}
+    grays = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames]
+    stages.update(bench_detector(frames, grays, face_rect))
+    stages.update(bench_metrics(landmarks))
+    stages["drawing"] = bench_drawing([frame.copy() for frame in frames], landmarks, face_rect)
+    stages.update(bench_event_logging(landmark_count))
+    stages["drowsiness_monitor"] = bench_monitor(landmarks, face_rect)
+    stages.update(bench_calibrator(landmarks))
+
+    return {
+        "meta": {
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "source": video or "synthetic",
+            "resolution": [width, height],
+            "frames": len(frames),
+            "landmark_sets": landmark_count,
+        },
+        "stages": stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do caminho crítico de detecção de sonolência.")
+    parser.add_argument("--frames", type=int, default=100, help="Frames para os estágios de imagem")
+    parser.add_argument("--landmarks", type=int, default=5000, help="Conjuntos de landmarks sintéticos")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--video", default=None, help="Usa frames de um vídeo gravado em vez de sintéticos")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    report = run(args.frames, args.landmarks, args.width, args.height, args.video)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as file:
+            file.write(text)
+        print(f"Resultado gravado em {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
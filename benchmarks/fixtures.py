@@ -0,0 +1,92 @@
+"""Dados sintéticos e gravados para os benchmarks (sem webcam nem display)."""
+import numpy as np
+
+
+def _ellipse(center, radii, count, start=0.0, stop=2 * np.pi, endpoint=False):
+    angles = np.linspace(start, stop, count, endpoint=endpoint)
+    return np.stack([center[0] + radii[0] * np.cos(angles),
+                     center[1] + radii[1] * np.sin(angles)], axis=1)
+
+
+def _eye(center, width, openness):
+    """Seis pontos no padrão do dlib: cantos em 0 e 3, pálpebra superior 1-2, inferior 4-5."""
+    half_w = width / 2.0
+    lid = width * 0.18 * openness
+    return np.array([
+        [center[0] - half_w, center[1]],
+        [center[0] - half_w / 3, center[1] - lid],
+        [center[0] + half_w / 3, center[1] - lid],
+        [center[0] + half_w, center[1]],
+        [center[0] + half_w / 3, center[1] + lid],
+        [center[0] - half_w / 3, center[1] + lid],
+    ])
+
+
+def synthetic_face(center=(320.0, 240.0), size=200.0, eye_openness=1.0, mouth_openness=0.2):
+    """Um rosto (68, 2) float64 com a topologia dos 68 landmarks do dlib."""
+    cx, cy = center
+    s = size / 200.0
+    jaw = _ellipse((cx, cy - 10 * s), (95 * s, 110 * s), 17, 0.1 * np.pi, 0.9 * np.pi, endpoint=True)
+    brows = np.concatenate([
+        _ellipse((cx - 45 * s, cy - 45 * s), (30 * s, 10 * s), 5, 1.1 * np.pi, 1.9 * np.pi, endpoint=True),
+        _ellipse((cx + 45 * s, cy - 45 * s), (30 * s, 10 * s), 5, 1.1 * np.pi, 1.9 * np.pi, endpoint=True),
+    ])
+    nose = np.concatenate([
+        np.stack([np.full(4, cx), cy - 30 * s + np.arange(4) * 15 * s], axis=1),
+        np.stack([cx + np.linspace(-15, 15, 5) * s, np.full(5, cy + 25 * s)], axis=1),
+    ])
+    eyes = np.concatenate([
+        _eye((cx - 40 * s, cy - 20 * s), 40 * s, eye_openness),
+        _eye((cx + 40 * s, cy - 20 * s), 40 * s, eye_openness),
+    ])
+    mouth_h = 10 * s + 50 * s * mouth_openness
+    outer = _ellipse((cx, cy + 55 * s), (40 * s, mouth_h), 12, np.pi, 3 * np.pi)
+    inner = _ellipse((cx, cy + 55 * s), (25 * s, mouth_h * 0.6), 8, np.pi, 3 * np.pi)
+    return np.concatenate([jaw, brows, nose, eyes, outer, inner])
+
+
+def synthetic_landmarks(count, seed=0, blink_every=90, blink_frames=5, yawn_every=900, yawn_frames=60):
+    """Lote (N, 68, 2) int32 simulando uma sequência com piscadas e bocejos periódicos."""
+    rng = np.random.default_rng(seed)
+    frames = np.arange(count)
+    eye_openness = np.where(frames % blink_every < blink_frames, 0.1, 1.0)
+    mouth_openness = np.where(frames % yawn_every < yawn_frames, 1.0, 0.1)
+    faces = {} # só existem quatro combinações de olhos/boca
+    batch = np.empty((count, 68, 2), dtype=np.float64)
+    for i in range(count):
+        key = (eye_openness[i], mouth_openness[i])
+        if key not in faces:
+            faces[key] = synthetic_face(eye_openness=key[0], mouth_openness=key[1])
+        batch[i] = faces[key]
+    batch += rng.normal(0.0, 0.7, batch.shape) # ruído de detecção
+    return np.rint(batch).astype(np.int32)
+
+
+def synthetic_frames(count, width=1280, height=720, seed=0):
+    """Frames BGR uint8 com ruído e uma elipse clara (custo do HOG não depende do conteúdo)."""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    yy, xx = np.ogrid[:height, :width]
+    face = ((xx - width / 2) / (width * 0.12)) ** 2 + ((yy - height / 2) / (height * 0.25)) ** 2 <= 1
+    base[face] = 200
+    return [np.roll(base, shift=i * 3, axis=1) for i in range(count)]
+
+
+def recorded_frames(video_path, count, width=None):
+    """Lê até 'count' frames de um vídeo gravado (opcionalmente redimensionados para 'width')."""
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if width and frame.shape[1] != width:
+            height = int(frame.shape[0] * width / frame.shape[1])
+            frame = cv2.resize(frame, (width, height))
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise ValueError(f"Nenhum frame lido de {video_path}")
+    return frames
@@ -1,10 +1,28 @@
-from flask import Flask, render_template, jsonify, request
-import pandas as pd
+from flask import Flask, Response, render_template, jsonify, request
+import json
 import os
-from modules.analyzer.event_logger import ALL_SESSIONS_CSV_PATH # Import the global CSV path
+import queue
+import threading
+import time
+from collections import OrderedDict
+from modules.analyzer.event_bus import event_bus
+from modules.analyzer.session_summary import SessionSummary, get_live_summary
+from modules.storage.session_store import SessionStore, SESSIONS_DB_PATH
+from modules.telemetry.telemetry import telemetry
 
 app = Flask(__name__)
 CURRENT_SESSION_ID = None # Will be set by main.py to default to the current session
+_store = None # SessionStore criado sob demanda (uma conexão por thread do Flask)
+_closed_summaries = OrderedDict() # LRU: session_id -> resumo de uma sessão encerrada (não muda mais)
+_closed_summaries_lock = threading.Lock()
+CLOSED_SUMMARY_CACHE_SIZE = 128
+
+def get_store():
+    """Retorna o banco indexado de sessões (reports/sessions.db)."""
+    global _store
+    if _store is None:
+        _store = SessionStore(SESSIONS_DB_PATH)
+    return _store
 
 @app.route('/')
 def index():
@@ -13,42 +31,108 @@ def index():
 
 @app.route('/api/sessions')
 def get_sessions():
-    """Retorna uma lista de todos os session_ids únicos no CSV."""
-    if not os.path.exists(ALL_SESSIONS_CSV_PATH):
-        return jsonify([]), 200 # Return empty list if file doesn't exist yet
-    
+    """Retorna uma lista de todos os session_ids únicos no banco de sessões."""
     try:
-        df = pd.read_csv(ALL_SESSIONS_CSV_PATH)
-        sessions = df['session_id'].unique().tolist()
-        return jsonify(sessions), 200
+        return jsonify(get_store().list_sessions()), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/events')
 def get_events():
-    """Retorna os dados de eventos do CSV como JSON, filtrados por session_id."""
+    """Retorna os eventos de uma sessão como JSON, filtrados por session_id (consulta indexada).
+
+    Parâmetros opcionais para buscas incrementais: 'after_id' (cursor de
+    linha, o usado pelo dashboard) e 'since' (timestamp estritamente maior,
+    que pula eventos com o mesmo timestamp); só as linhas novas são retornadas.
+    """
     session_id = request.args.get('session_id')
+    since = request.args.get('since', type=float)
+    after_id = request.args.get('after_id', type=int)
 
-    if not os.path.exists(ALL_SESSIONS_CSV_PATH):
-        return jsonify([]), 200 # Return empty list if file doesn't exist yet
-    
     try:
-        df = pd.read_csv(ALL_SESSIONS_CSV_PATH)
-        
-        if session_id:
-            df_filtered = df[df['session_id'] == session_id]
-        else:
+        store = get_store()
+        if not session_id:
             # If no session_id is provided, return data for the most recent session
-            if not df.empty:
-                latest_session_id = df['session_id'].iloc[-1] # Assumes last entry is from latest session
-                df_filtered = df[df['session_id'] == latest_session_id]
-            else:
-                df_filtered = pd.DataFrame() # Empty dataframe
+            session_id = store.latest_session_id()
+            if session_id is None:
+                return jsonify([]), 200
+
+        return jsonify(store.get_events(session_id, since=since, after_id=after_id))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _stored_session_summary(session_id):
+    """Resumo de uma sessão a partir do banco, ou None se ela não tiver eventos.
+
+    Só sessões marcadas como encerradas pelo banco entram em cache: uma sessão
+    que outro processo ainda grava, ou que não existe, é sempre relida.
+    """
+    with _closed_summaries_lock:
+        summary = _closed_summaries.get(session_id)
+        if summary is not None:
+            _closed_summaries.move_to_end(session_id)
+            return summary
 
-        return jsonify(df_filtered.to_dict(orient='records'))
+    store = get_store()
+    # Verificado antes da leitura: encerrada aqui, os eventos lidos já estão completos
+    closed = store.is_session_closed(session_id)
+    events = store.get_events(session_id)
+    if not events:
+        return None
+    summary = SessionSummary.from_events(session_id, events, store.get_metrics(session_id)).to_dict()
+    if closed:
+        with _closed_summaries_lock:
+            _closed_summaries[session_id] = summary
+            _closed_summaries.move_to_end(session_id)
+            if len(_closed_summaries) > CLOSED_SUMMARY_CACHE_SIZE:
+                _closed_summaries.popitem(last=False)
+    return summary
+
+@app.route('/api/sessions/<session_id>/summary')
+def get_session_summary(session_id):
+    """Agregados da sessão: contagens por tipo, eventos por minuto, métricas e pico de risco."""
+    try:
+        live_summary = get_live_summary(session_id)
+        if live_summary is not None:
+            # Sessão em andamento: agregados mantidos incrementalmente pelo EventLogger
+            return jsonify(live_summary.to_dict())
+        summary = _stored_session_summary(session_id)
+        if summary is None:
+            return jsonify({"error": f"Sessão {session_id} não encontrada"}), 404
+        return jsonify(summary)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/stream')
+def stream_events():
+    """Stream Server-Sent Events com os novos eventos da sessão, publicados ao serem gravados.
+
+    Cada evento traz o 'id' da linha: ao (re)conectar, o cliente busca em
+    /api/events?after_id= o que foi gravado antes da assinatura.
+    """
+    session_id = request.args.get('session_id') or None
+
+    def generate():
+        subscription = event_bus.subscribe(session_id)
+        try:
+            while True:
+                try:
+                    event = subscription.get(timeout=15.0)
+                except queue.Empty:
+                    yield ": keepalive\n\n" # mantém a conexão aberta através de proxies
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/metrics')
+def metrics():
+    """Métricas do caminho crítico (FPS, descartes, latências, filas, eventos) no formato do Prometheus."""
+    return Response(telemetry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 def run_dashboard_server(current_session_id):
     """Função para iniciar o servidor Flask."""
     global CURRENT_SESSION_ID
@@ -63,12 +147,11 @@ if __name__ == '__main__':
     # Ensure the reports directory exists for testing
     if not os.path.exists('reports'):
         os.makedirs('reports')
-    # Create a dummy CSV for testing
-    with open(ALL_SESSIONS_CSV_PATH, 'w', newline='') as f:
-        import csv
-        writer = csv.writer(f)
-        writer.writerow(['session_id', 'timestamp', 'event_type', 'metric_value'])
-        writer.writerow(['test_session_1', time.time(), 'olhos', 0.1])
-        writer.writerow(['test_session_1', time.time() + 5, 'bocejo', 0.6])
-        writer.writerow(['test_session_2', time.time() + 10, 'olhos', 0.15])
+    # Insert dummy events for testing
+    now = time.time()
+    get_store().insert_events([
+        ('test_session_1', now, 'olhos', 0.1),
+        ('test_session_1', now + 5, 'bocejo', 0.6),
+        ('test_session_2', now + 10, 'olhos', 0.15),
+    ])
     run_dashboard_server('test_session_1')
\ No newline at end of file
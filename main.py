@@ -1,19 +1,68 @@
 from utils.alert_manager import AlertManager
+from utils.alert_dispatcher import ALERT_EYES, ALERT_YAWN, LogOutput, SoundOutput, WebhookOutput
 from modules.detector.face_detector import FaceDetector
 from modules.analyzer.event_logger import EventLogger # Changed import
 from modules.calibrator.calibrator import Calibrator
+from modules.calibrator.offline_calibration import load_cached_thresholds
+from modules.analyzer.drowsiness_monitor import DrowsinessMonitor
+from modules.storage.frame_recorder import RECORDINGS_DIR, FrameRecorder
 import cv2
 import time
-import dashboard_server # New import
 import threading # New import
 import datetime # New import
 import os # New import
+import argparse
+from modules.pipeline.governor import FrameGovernor
+from modules.pipeline.pipeline import Pipeline
+from modules.telemetry.overlay import draw_stats_overlay
+from modules.telemetry.telemetry import telemetry
+
+def run_live_calibration(results, calibrator, face_detector):
+    """Calibração interativa em três fases; retorna (EAR, MAR) ou None se 'q' for pressionado."""
+    for packet in results:
+        frame = packet.frame
+
+        calibrator.update_phase()
+        if calibrator.calibration_done:
+            break
+        instruction = calibrator.get_instructions()
+
+        cv2.putText(frame, instruction, (20, 30),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+        cv2.putText(frame, f"Fase: {calibrator.current_phase + 1}/3", (20, 70),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+
+        measurements = packet.result
+        if packet.analyzed and len(measurements) == 1:
+            points = measurements[0].points
+            ear = face_detector.calculate_ear(points, face_detector.LEFT_EYE_POINTS)
+            mar = measurements[0].mar
+            calibrator.add_sample(ear, mar)
+
+        cv2.imshow("Calibracao", frame)
+        if cv2.waitKey(1) == ord('q'):
+            return None
+
+    # --- Finalização da Calibração ---
+    cv2.destroyWindow("Calibracao")
+    return calibrator.calculate_thresholds()
+
+def main(show_overlay=False, enable_metrics=True, target_fps=20.0, driver_id=None, record=False,
+         sound=True, alert_webhook=None):
+    # Sem métricas os contadores viram retornos imediatos e /metrics fica vazio
+    telemetry.enabled = enable_metrics
+
+    # Import adiado: o Flask só é carregado quando o dashboard é de fato iniciado
+    import dashboard_server
 
-def main():
     # --- Configurações Iniciais ---
     cap = cv2.VideoCapture(0)
     face_detector = FaceDetector()
-    alert_manager = AlertManager()
+    # Saídas dos alertas, atendidas pela thread do AlertDispatcher (sem som: servidores headless)
+    alert_outputs = [SoundOutput()] if sound else [LogOutput("[alerta] ")]
+    if alert_webhook:
+        alert_outputs.append(WebhookOutput(alert_webhook, source=driver_id))
+    alert_manager = AlertManager(outputs=alert_outputs)
     calibrator = Calibrator()
 
     # Ensure reports directory exists
@@ -31,115 +80,120 @@ def main():
     print(f"Dashboard server started at http://127.0.0.1:5000, current session ID: {session_id}")
 
 
-    # --- Loop de Calibração ---
-    while not calibrator.calibration_done:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        calibrator.update_phase()
-        instruction = calibrator.get_instructions()
-
-        cv2.putText(frame, instruction, (20, 30),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-        cv2.putText(frame, f"Fase: {calibrator.current_phase + 1}/3", (20, 70),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-
-        faces = face_detector.detect_faces(frame)
-        if len(faces) == 1:
-            landmarks = face_detector.get_landmarks(frame, faces[0])
-            ear = face_detector.calculate_ear(landmarks, face_detector.LEFT_EYE_POINTS)
-            mar = face_detector.calculate_mar(landmarks, face_detector.MOUTH_POINTS)
-            calibrator.add_sample(ear, mar)
-
-        cv2.imshow("Calibracao", frame)
-        if cv2.waitKey(1) == ord('q'):
-            cap.release()
-            cv2.destroyAllWindows()
-            return # Encerra a aplicação se 'q' for pressionado
-
-    # --- Finalização da Calibração ---
-    cv2.destroyWindow("Calibracao")
-    EAR_THRESHOLD, MAR_THRESHOLD = calibrator.calculate_thresholds()
+    # --- Pipeline: captura e inferência em threads próprias ---
+    # A renderização e os alertas ficam na thread principal (exigência do cv2.imshow)
+    # O governador reduz a escala da detecção e pula frames quando falta CPU (target_fps None desliga)
+    governor = FrameGovernor(target_fps, face_detector) if target_fps else None
+    pipeline = Pipeline(cap, face_detector.analyze, governor=governor)
+    pipeline.start()
+    results = pipeline.results()
+
+    # --- Calibração: limiares do cache offline do motorista ou fases ao vivo ---
+    thresholds = load_cached_thresholds(driver_id) if driver_id else None
+    if thresholds is not None:
+        print(f"Limiares do motorista {driver_id} carregados da calibração offline")
+    else:
+        if driver_id:
+            print(f"Motorista {driver_id} sem calibração offline, iniciando calibração ao vivo")
+        thresholds = run_live_calibration(results, calibrator, face_detector)
+    if thresholds is None:
+        pipeline.stop()
+        alert_manager.close()
+        cap.release()
+        cv2.destroyAllWindows()
+        return # Encerra a aplicação se 'q' for pressionado
+    EAR_THRESHOLD, MAR_THRESHOLD = thresholds
     # Initialize EventLogger with the calculated thresholds and session ID
     sleepiness_analyzer = EventLogger(session_id, EAR_THRESHOLD, MAR_THRESHOLD) # Changed class name and added session_id
     print(f"Limiares calculados - EAR: {EAR_THRESHOLD:.2f}, MAR: {MAR_THRESHOLD:.2f}")
 
     # --- Configurações do Sistema Principal ---
-    EYE_CLOSED_THRESHOLD = 2.0
-    MOUTH_OPEN_THRESHOLD = 2.0
     SONOLENCIA_THRESHOLD = 3
-    eye_closed_start_time = None
-    mouth_open_start_time = None
-
-    # --- Loop de Detecção Principal ---
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        faces = face_detector.detect_faces(frame)
-
-        for face in faces:
+    monitor = DrowsinessMonitor(sleepiness_analyzer, eye_closed_threshold=2.0,
+                                mouth_open_threshold=2.0, min_events=SONOLENCIA_THRESHOLD)
+    # Medidas de cada frame analisado, para reanálise com outros limiares (modules.analyzer.replay)
+    recorder = None
+    if record:
+        recorder = FrameRecorder(os.path.join(RECORDINGS_DIR, session_id), session_id, driver_id=driver_id,
+                                 ear_threshold=EAR_THRESHOLD, mar_threshold=MAR_THRESHOLD)
+
+    # --- Loop de Detecção Principal (estágio de renderização/alerta) ---
+    tracked = []
+    for packet in results:
+        render_start = time.perf_counter()
+        frame = packet.frame
+        current_time = packet.timestamp # instante da captura, não do processamento
+
+        # Cada rosto recebe um ID estável e seu próprio estado (temporizadores, janela de eventos).
+        # Frames pulados pelo governador só repetem o último desenho, sem novos disparos
+        if packet.analyzed:
+            tracked = monitor.process(packet.result, current_time)
+            if recorder is not None:
+                recorder.record_frame(packet.index, current_time, packet.result,
+                                      [track.track_id for _, track, _ in tracked])
+        else:
+            tracked = [(measurement, track, []) for measurement, track, _ in tracked]
+        for (face, points, avg_ear, mar), track, triggered in tracked:
             x, y, w, h = face.left(), face.top(), face.width(), face.height()
             cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            cv2.putText(frame, f"ID {track.track_id}", (x, y + h + 20),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+
+            if "olhos" in triggered:
+                alert_manager.trigger_alert(frame, "ALERTA: OLHOS FECHADOS!", (x, y - 70), kind=ALERT_EYES)
 
-            landmarks = face_detector.get_landmarks(frame, face)
-            current_time = time.time()
-
-            # Análise EAR
-            left_ear = face_detector.calculate_ear(landmarks, face_detector.LEFT_EYE_POINTS)
-            right_ear = face_detector.calculate_ear(landmarks, face_detector.RIGHT_EYE_POINTS)
-            avg_ear = (left_ear + right_ear) / 2.0
-
-            if avg_ear < EAR_THRESHOLD:
-                if eye_closed_start_time is None:
-                    eye_closed_start_time = current_time
-                elif current_time - eye_closed_start_time >= EYE_CLOSED_THRESHOLD:
-                    sleepiness_analyzer.add_event("olhos", current_time, avg_ear) # Added avg_ear
-                    alert_manager.trigger_alert(frame, "ALERTA: OLHOS FECHADOS!", (x, y - 70))
-                    eye_closed_start_time = None
-            else:
-                eye_closed_start_time = None
-
-            # Análise MAR
-            mar = face_detector.calculate_mar(landmarks, face_detector.MOUTH_POINTS)
             cv2.putText(frame, f"MAR: {mar:.2f} (Limiar: {MAR_THRESHOLD:.2f})",
                        (x, y - 100), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-
-            if mar > MAR_THRESHOLD:
-                if mouth_open_start_time is None:
-                    mouth_open_start_time = current_time
-                elif current_time - mouth_open_start_time >= MOUTH_OPEN_THRESHOLD:
-                    sleepiness_analyzer.add_event("bocejo", current_time, mar) # Added mar
-                    alert_manager.trigger_alert(frame, "BOCEJO DETECTADO!", (x, y - 130))
-                    mouth_open_start_time = None
-            else:
-                mouth_open_start_time = None
-
-            # Verificação geral de risco
-            if sleepiness_analyzer.evaluate_risk(min_events=SONOLENCIA_THRESHOLD):
-                alert_manager.trigger_alert(frame, "ALERTA: MOTORISTA SONOLENTO", (10, 120))
-            else:
-                alert_manager.stop_alert()
-
-            # Exibe contagem de eventos
-            total_eventos = len(sleepiness_analyzer.get_recent_events())
-            cv2.putText(frame, f"Eventos: {total_eventos}/{SONOLENCIA_THRESHOLD}",
-                       (10, 160), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            if "bocejo" in triggered:
+                alert_manager.trigger_alert(frame, "BOCEJO DETECTADO!", (x, y - 130), kind=ALERT_YAWN)
 
             # Desenha landmarks
-            for n in range(68):
-                x_point = landmarks.part(n).x
-                y_point = landmarks.part(n).y
-                cv2.circle(frame, (x_point, y_point), 1, (255, 0, 0), -1)
+            for x_point, y_point in points:
+                cv2.circle(frame, (int(x_point), int(y_point)), 1, (255, 0, 0), -1)
+
+        # Verificação geral de risco (uma vez por frame)
+        at_risk = monitor.is_at_risk(current_time)
+        if at_risk:
+            alert_manager.trigger_alert(frame, "ALERTA: MOTORISTA SONOLENTO", (10, 120))
+        else:
+            alert_manager.stop_alert()
+        # Olhos fechados ou alerta pendente: todos os frames são analisados
+        if governor is not None:
+            governor.set_urgent(at_risk or monitor.has_pending_event())
+
+        # Exibe contagem de eventos
+        total_eventos = monitor.recent_event_count(current_time)
+        cv2.putText(frame, f"Eventos: {total_eventos}/{SONOLENCIA_THRESHOLD}",
+                   (10, 160), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        if show_overlay:
+            draw_stats_overlay(frame, pipeline.stats())
 
         cv2.imshow("Detecção de Sonolência", frame)
+        pipeline.record_render(packet, render_start)
         if cv2.waitKey(1) == ord('q'):
             break
 
+    pipeline.stop()
+    sleepiness_analyzer.close() # grava os eventos ainda na fila
+    if recorder is not None:
+        recorder.close()
+    alert_manager.close()
+    print(f"Estatísticas do pipeline: {pipeline.stats()}")
     cap.release()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Detector de sonolência com webcam e dashboard.")
+    parser.add_argument("--overlay", action="store_true", help="Mostra FPS, latências e descartes no vídeo")
+    parser.add_argument("--no-metrics", action="store_true", help="Desliga a telemetria servida em /metrics")
+    parser.add_argument("--target-fps", type=float, default=20.0,
+                        help="FPS alvo do governador de resolução/frames (0 analisa todos os frames)")
+    parser.add_argument("--driver", default=None,
+                        help="ID do motorista: usa os limiares da calibração offline em vez da calibração ao vivo")
+    parser.add_argument("--record", action="store_true",
+                        help="Grava EAR/MAR/rostos de cada frame em reports/recordings/<sessão>")
+    parser.add_argument("--no-sound", action="store_true", help="Alertas só no log, sem pygame (headless)")
+    parser.add_argument("--alert-webhook", default=None, help="URL que recebe cada alerta via HTTP POST")
+    args = parser.parse_args()
+    main(show_overlay=args.overlay, enable_metrics=not args.no_metrics, target_fps=args.target_fps,
+         driver_id=args.driver, record=args.record, sound=not args.no_sound, alert_webhook=args.alert_webhook)
@@ -0,0 +1,125 @@
+from collections import deque
+from typing import List, Optional, Tuple
+
+from modules.analyzer.event_logger import EventLogger
+from modules.analyzer.streaming_metrics import StreamingMetrics
+from modules.tracker.face_tracker import FaceTrack, FaceTracker, count_recent
+
+
+class DrowsinessMonitor:
+    """Lógica de limiares e temporizadores compartilhada entre o modo ao vivo e a análise offline.
+
+    Compara EAR/MAR com os limiares do EventLogger e registra um evento quando
+    os olhos ficam fechados (ou a boca aberta) por tempo suficiente. Todo o
+    tempo vem do 'timestamp' recebido, então funciona tanto com o relógio da
+    captura quanto com o tempo do vídeo.
+
+    Com 'process' cada rosto ganha um ID estável (FaceTracker) e seus próprios
+    temporizadores e janela de eventos, então passageiros não interferem no
+    estado do motorista. O risco sai sempre das janelas por rosto, inclusive
+    das trilhas perdidas há pouco, que o FaceTracker guarda (com a janela)
+    por 'risk_window' segundos para o caso de o rosto reaparecer.
+    """
+
+    def __init__(self, event_logger: EventLogger, eye_closed_threshold: float = 2.0,
+                 mouth_open_threshold: float = 2.0, min_events: int = 3, risk_window: Optional[float] = None,
+                 tracker: Optional[FaceTracker] = None, ema_alpha: float = 0.3,
+                 metrics_interval: Optional[float] = 5.0):
+        self.event_logger = event_logger
+        self.EYE_CLOSED_THRESHOLD = eye_closed_threshold
+        self.MOUTH_OPEN_THRESHOLD = mouth_open_threshold
+        self.SONOLENCIA_THRESHOLD = min_events
+        # Por padrão a janela de risco é a própria janela do EventLogger
+        self.risk_window = risk_window if risk_window is not None else event_logger.window
+        self.tracker = tracker if tracker is not None else FaceTracker(lost_retention=self.risk_window)
+        self.ema_alpha = ema_alpha
+        # Cadência (s) com que PERCLOS/piscadas do motorista vão para o EventLogger; None desliga
+        self.metrics_interval = metrics_interval
+        self._last_metrics_log: Optional[float] = None
+        # Temporizadores e janela de eventos usados por 'update' quando nenhuma trilha é informada
+        self.eye_closed_start_time: Optional[float] = None
+        self.mouth_open_start_time: Optional[float] = None
+        self.events = deque()
+
+    def process(self, measurements, timestamp: float) -> List[Tuple[object, FaceTrack, List[str]]]:
+        """Processa todos os rostos de um frame (FaceMeasurement).
+
+        Retorna (measurement, trilha, eventos disparados) para cada rosto.
+        """
+        boxes = [(m.face.left(), m.face.top(), m.face.right(), m.face.bottom()) for m in measurements]
+        tracks = self.tracker.update(boxes, timestamp)
+        results = []
+        for measurement, track in zip(measurements, tracks):
+            if track.metrics is None:
+                track.metrics = StreamingMetrics(self.event_logger.EAR_THRESHOLD, ema_alpha=self.ema_alpha)
+            track.metrics.update(measurement.ear, timestamp)
+            results.append((measurement, track, self.update(measurement.ear, measurement.mar, timestamp, track)))
+
+        if tracks and self.metrics_interval is not None:
+            self._log_metrics(tracks, timestamp)
+        return results
+
+    def _log_metrics(self, tracks: List[FaceTrack], timestamp: float):
+        """Registra as métricas contínuas do motorista (o rosto rastreado há mais tempo)."""
+        if self._last_metrics_log is not None and timestamp - self._last_metrics_log < self.metrics_interval:
+            return
+        self._last_metrics_log = timestamp
+        driver = min(tracks, key=lambda track: track.first_seen)
+        for name, value in driver.metrics.snapshot(timestamp).items():
+            self.event_logger.add_metric(name, timestamp, value)
+
+    def update(self, ear: float, mar: float, timestamp: float, track: Optional[FaceTrack] = None) -> List[str]:
+        """Atualiza os temporizadores e retorna os tipos de evento disparados ('olhos', 'bocejo').
+
+        Com 'track' usa o estado daquele rosto; sem ele, o estado único do monitor.
+        """
+        state = track if track is not None else self
+        triggered = []
+
+        # Análise EAR
+        if ear < self.event_logger.EAR_THRESHOLD:
+            if state.eye_closed_start_time is None:
+                state.eye_closed_start_time = timestamp
+            elif timestamp - state.eye_closed_start_time >= self.EYE_CLOSED_THRESHOLD:
+                self.event_logger.add_event("olhos", timestamp, ear)
+                triggered.append("olhos")
+                state.eye_closed_start_time = None
+        else:
+            state.eye_closed_start_time = None
+
+        # Análise MAR
+        if mar > self.event_logger.MAR_THRESHOLD:
+            if state.mouth_open_start_time is None:
+                state.mouth_open_start_time = timestamp
+            elif timestamp - state.mouth_open_start_time >= self.MOUTH_OPEN_THRESHOLD:
+                self.event_logger.add_event("bocejo", timestamp, mar)
+                triggered.append("bocejo")
+                state.mouth_open_start_time = None
+        else:
+            state.mouth_open_start_time = None
+
+        if triggered:
+            state.events.extend([timestamp] * len(triggered))
+        # Poda a cada frame: a janela fica limitada mesmo sem chamadas a 'is_at_risk'
+        count_recent(state.events, timestamp, self.risk_window)
+        return triggered
+
+    def has_pending_event(self) -> bool:
+        """Algum rosto com olhos fechados ou boca aberta ainda sem evento disparado."""
+        states = self.tracker.tracks or [self]
+        return any(state.eye_closed_start_time is not None or state.mouth_open_start_time is not None
+                   for state in states)
+
+    def is_at_risk(self, timestamp: float) -> bool:
+        """Verificação geral de risco (uma vez por frame): algum rosto com eventos suficientes na janela."""
+        return self.recent_event_count(timestamp) >= self.SONOLENCIA_THRESHOLD
+
+    def recent_event_count(self, timestamp: float) -> int:
+        """Eventos na janela de risco do rosto mais crítico, visível ou perdido há pouco.
+
+        Chamadas de 'update' sem trilha contam como mais um rosto (o estado único do monitor).
+        """
+        count = count_recent(self.events, timestamp, self.risk_window)
+        for track in self.tracker.tracks + self.tracker.lost:
+            count = max(count, track.recent_events(timestamp, self.risk_window))
+        return count
@@ -0,0 +1,46 @@
+import queue
+import threading
+from typing import List, Optional
+
+
+class EventBus:
+    """Publicação/assinatura em memória dos eventos registrados pelo EventLogger.
+
+    Alimenta o stream Server-Sent Events do dashboard. Cada assinante tem uma
+    fila limitada; se um cliente lento deixar a fila encher, os eventos mais
+    antigos dele são descartados, nunca bloqueando quem publica.
+    """
+
+    def __init__(self, max_queue_size: int = 256):
+        self.max_queue_size = max_queue_size
+        self._subscribers: List[tuple] = [] # (session_id ou None, fila)
+        self._lock = threading.Lock()
+
+    def subscribe(self, session_id: Optional[str] = None) -> "queue.Queue":
+        """Assina os eventos de uma sessão (ou de todas, com None)."""
+        subscription = queue.Queue(self.max_queue_size)
+        with self._lock:
+            self._subscribers = self._subscribers + [(session_id, subscription)]
+        return subscription
+
+    def unsubscribe(self, subscription: "queue.Queue"):
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s[1] is not subscription]
+
+    def publish(self, event: dict):
+        # Cópia imutável da lista: publicar não precisa do lock
+        for session_id, subscription in self._subscribers:
+            if session_id is not None and session_id != event.get("session_id"):
+                continue
+            try:
+                subscription.put_nowait(event)
+            except queue.Full:
+                try:
+                    subscription.get_nowait()
+                except queue.Empty:
+                    pass
+                subscription.put_nowait(event)
+
+
+# Barramento do processo: o EventLogger publica, o dashboard assina
+event_bus = EventBus()
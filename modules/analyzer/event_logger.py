@@ -1,56 +1,150 @@
 import time
-import csv
 import os
-from typing import List, Tuple
+from collections import Counter, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from modules.analyzer.event_bus import event_bus
+from modules.analyzer.session_summary import SessionSummary, register_live_summary, unregister_live_summary
+from modules.analyzer.event_sinks import (METRIC_HEADERS, AsyncEventWriter, CsvEventSink, EventSink, MultiSink,
+                                         SqliteEventSink, SqliteMetricSink)
+from modules.storage.session_store import SESSIONS_DB_PATH
+from modules.telemetry.telemetry import telemetry
 
 # Caminho para o arquivo CSV único que armazenará dados de todas as sessões
 ALL_SESSIONS_CSV_PATH = os.path.join("reports", "all_sessions_data.csv")
 
+
+def _background_writer(sinks, name: str) -> Optional[EventSink]:
+    """Destinos gravados em segundo plano por um AsyncEventWriter (None sem destinos)."""
+    if not sinks:
+        return None
+    return AsyncEventWriter(sinks[0] if len(sinks) == 1 else MultiSink(sinks), name=name)
+
+
 class EventLogger:
-    def __init__(self, session_id: str, ear_threshold: float = 0.2, mar_threshold: float = 0.5):
+    def __init__(self, session_id: str, ear_threshold: float = 0.2, mar_threshold: float = 0.5,
+                 csv_path: Optional[str] = ALL_SESSIONS_CSV_PATH, window: float = 30.0,
+                 sink: Optional[EventSink] = None, db_path: Optional[str] = SESSIONS_DB_PATH,
+                 live: bool = True, metric_sink: Optional[EventSink] = None):
         self.session_id = session_id
         self.EAR_THRESHOLD = ear_threshold
         self.MAR_THRESHOLD = mar_threshold
-        self.events: List[Tuple[str, float, float]] = [] # (event_type, timestamp, metric_value)
-        self._initialize_csv()
-        
-    def _initialize_csv(self):
-        """Inicializa o arquivo CSV único com cabeçalhos se ele não existir ou estiver incorreto."""
-        headers = ['session_id', 'timestamp', 'event_type', 'metric_value']
-        
-        if not os.path.exists(ALL_SESSIONS_CSV_PATH):
-            with open(ALL_SESSIONS_CSV_PATH, mode='w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(headers)
-        else:
-            # Verifica se o cabeçalho existente é o esperado
-            with open(ALL_SESSIONS_CSV_PATH, mode='r', newline='') as file:
-                reader = csv.reader(file)
-                try:
-                    current_headers = next(reader)
-                    if current_headers != headers:
-                        print(f"Aviso: Cabeçalho do CSV {ALL_SESSIONS_CSV_PATH} está incorreto. Por favor, verifique ou remova o arquivo para recriá-lo.")
-                        # Poderíamos adicionar uma lógica para recriar o arquivo ou migrar dados, mas por enquanto, apenas avisamos.
-                except StopIteration:
-                    # Arquivo existe mas está vazio, escreve o cabeçalho
-                    with open(ALL_SESSIONS_CSV_PATH, mode='w', newline='') as file:
-                        writer = csv.writer(file)
-                        writer.writerow(headers)
+        # Apenas os eventos dentro da janela ficam em memória; o histórico completo vai para o CSV
+        self.window = window
+        self.events: Deque[Tuple[str, float, float]] = deque() # (event_type, timestamp, metric_value)
+        self._counts: Dict[str, int] = Counter() # eventos na janela por tipo
+        self.total_events = 0
+        # Agregados da sessão inteira, servidos pelo dashboard enquanto ela está aberta.
+        # Com live=False (ex.: reprodução de gravações) a sessão não aparece no dashboard,
+        # no stream ao vivo nem na telemetria
+        self.summary = SessionSummary(session_id, window)
+        self.live = live
+        if live:
+            register_live_summary(self.summary)
+        # Por padrão eventos e métricas vão, em segundo plano, para o banco e o CSV;
+        # com o banco quem publica no stream ao vivo é o SqliteEventSink
+        self.csv_path = csv_path
+        self._publish_on_add = live
+        if sink is None:
+            sinks = []
+            if db_path:
+                sinks.append(SqliteEventSink(db_path, publish=live, session_id=session_id))
+                self._publish_on_add = False
+            if csv_path:
+                sinks.append(CsvEventSink(csv_path))
+            sink = _background_writer(sinks, session_id)
+
+            if metric_sink is None:
+                metric_sinks = []
+                if db_path:
+                    metric_sinks.append(SqliteMetricSink(db_path))
+                if csv_path:
+                    metric_sinks.append(CsvEventSink(os.path.splitext(csv_path)[0] + "_metrics.csv", METRIC_HEADERS))
+                metric_sink = _background_writer(metric_sinks, f"{session_id}_metrics")
+        self.sink = sink
+        self.metric_sink = metric_sink
+        self._event_counters: Dict[str, object] = {} # tipo -> Counter da telemetria
         
     def add_event(self, event_type: str, timestamp: float, metric_value: float):
-        """Registra um evento (olhos/bocejo) com timestamp e valor da métrica, e salva no CSV único."""
+        """Registra um evento (olhos/bocejo) com timestamp e valor da métrica e o envia ao destino."""
+        self._prune(timestamp) # a janela fica limitada mesmo sem consultas de risco
         self.events.append((event_type, timestamp, metric_value))
-        with open(ALL_SESSIONS_CSV_PATH, mode='a', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow([self.session_id, timestamp, event_type, metric_value])
+        self._counts[event_type] += 1
+        self.total_events += 1
+        self.summary.add(event_type, timestamp, metric_value)
+        if self.sink is not None:
+            self.sink.write([self.session_id, timestamp, event_type, metric_value])
+        if not self.live:
+            return
+        counter = self._event_counters.get(event_type)
+        if counter is None:
+            counter = self._event_counters[event_type] = telemetry.counter(
+                "events_total", "Eventos de sonolência registrados", session_id=self.session_id,
+                event_type=event_type)
+        counter.inc()
+        if self._publish_on_add:
+            # Envia o delta para o stream ao vivo do dashboard (sem id: não está no banco)
+            event_bus.publish({"session_id": self.session_id, "timestamp": timestamp,
+                               "event_type": event_type, "metric_value": metric_value})
+
+    def add_metric(self, name: str, timestamp: float, value: float):
+        """Registra uma amostra de métrica contínua (ex.: PERCLOS).
+
+        Vai para 'metric_sink', separado dos eventos, e não conta na janela de risco.
+        """
+        self.summary.add_metric(name, timestamp, value)
+        if self.metric_sink is not None:
+            self.metric_sink.write([self.session_id, timestamp, name, value])
+
+    def close(self):
+        """Grava os eventos pendentes, fecha os destinos e encerra a sessão."""
+        if self.sink is not None:
+            self.sink.close()
+        if self.metric_sink is not None:
+            self.metric_sink.close()
+        if self.live:
+            unregister_live_summary(self.session_id)
         
-    def evaluate_risk(self, time_window: float = 30.0, min_events: int = 3) -> bool:
-        """Verifica se há risco crítico nos últimos 'time_window' segundos."""
-        current_time = time.time()
-        recent_events = [e for e in self.events if current_time - e[1] <= time_window]
-        return len(recent_events) >= min_events
-    
-    def get_recent_events(self, time_window: float = 30.0) -> list:
-        """Retorna eventos recentes da sessão atual."""
-        current_time = time.time()
-        return [e for e in self.events if current_time - e[1] <= time_window]
\ No newline at end of file
+    def _prune(self, current_time: float):
+        """Remove pela esquerda os eventos que saíram da janela (custo amortizado O(1))."""
+        cutoff = current_time - self.window
+        while self.events and self.events[0][1] < cutoff:
+            event_type = self.events.popleft()[0]
+            self._counts[event_type] -= 1
+
+    def evaluate_risk(self, time_window: float = 30.0, min_events: int = 3,
+                      current_time: Optional[float] = None) -> bool:
+        """Verifica se há risco crítico nos últimos 'time_window' segundos.
+
+        'current_time' permite avaliar em tempo de vídeo (análise offline); por padrão usa time.time().
+        """
+        if current_time is None:
+            current_time = time.time()
+        self._prune(current_time)
+        if time_window >= self.window:
+            return len(self.events) >= min_events
+        return len(self.get_recent_events(time_window, current_time)) >= min_events
+
+    def get_recent_events(self, time_window: float = 30.0, current_time: Optional[float] = None) -> list:
+        """Retorna eventos recentes da sessão atual (no máximo os da janela do logger)."""
+        if current_time is None:
+            current_time = time.time()
+        self._prune(current_time)
+        if time_window >= self.window:
+            return list(self.events)
+
+        # Janela menor: percorre só a cauda, do evento mais novo para o mais antigo
+        recent = []
+        for event in reversed(self.events):
+            if current_time - event[1] > time_window:
+                break
+            recent.append(event)
+        recent.reverse()
+        return recent
+
+    def recent_counts(self, current_time: Optional[float] = None) -> Dict[str, int]:
+        """Contagem de eventos por tipo dentro da janela."""
+        if current_time is None:
+            current_time = time.time()
+        self._prune(current_time)
+        return {event_type: count for event_type, count in self._counts.items() if count}
@@ -0,0 +1,261 @@
+import atexit
+import csv
+import json
+import os
+import queue
+import threading
+import time
+from typing import Iterable, List, Optional, Sequence
+
+from modules.analyzer.event_bus import event_bus
+from modules.storage.session_store import SESSIONS_DB_PATH, SessionStore
+from modules.telemetry.telemetry import telemetry
+
+# Colunas de cada evento, na ordem em que chegam aos destinos
+EVENT_HEADERS = ['session_id', 'timestamp', 'event_type', 'metric_value']
+# Colunas das amostras de métricas contínuas (PERCLOS, piscadas), gravadas à parte
+METRIC_HEADERS = ['session_id', 'timestamp', 'name', 'value']
+
+
+class EventSink:
+    """Destino de eventos. Cada linha segue EVENT_HEADERS.
+
+    Implementações só precisam de 'write_batch'; 'flush' e 'close' são opcionais.
+    """
+
+    def write(self, row: Sequence):
+        self.write_batch([row])
+
+    def write_batch(self, rows: List[Sequence]):
+        raise NotImplementedError
+
+    def flush(self, fsync: bool = False):
+        pass
+
+    def close(self):
+        pass
+
+
+class _FileEventSink(EventSink):
+    """Base para destinos em arquivo de texto mantidos abertos em modo append."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, mode='a', newline='')
+
+    def flush(self, fsync: bool = False):
+        if self._file is None:
+            return
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self.flush(fsync=True)
+            self._file.close()
+            self._file = None
+
+
+class CsvEventSink(_FileEventSink):
+    """Grava eventos no CSV único de todas as sessões ('headers' muda as colunas, ex.: METRIC_HEADERS)."""
+
+    def __init__(self, path: str, headers: List[str] = EVENT_HEADERS):
+        super().__init__(path)
+        self.headers = headers
+        self._initialize_csv()
+
+    def _initialize_csv(self):
+        """Inicializa o arquivo CSV com cabeçalhos se ele não existir ou estiver incorreto."""
+        if os.path.exists(self.path):
+            # Verifica se o cabeçalho existente é o esperado
+            with open(self.path, mode='r', newline='') as file:
+                reader = csv.reader(file)
+                try:
+                    current_headers = next(reader)
+                    if current_headers != self.headers:
+                        print(f"Aviso: Cabeçalho do CSV {self.path} está incorreto. Por favor, verifique ou remova o arquivo para recriá-lo.")
+                    return
+                except StopIteration:
+                    pass # Arquivo existe mas está vazio, escreve o cabeçalho
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, mode='w', newline='') as file:
+            csv.writer(file).writerow(self.headers)
+
+    def write_batch(self, rows: List[Sequence]):
+        if self._file is None:
+            self._open()
+            self._writer = csv.writer(self._file)
+        self._writer.writerows(rows)
+
+
+class JsonLinesEventSink(_FileEventSink):
+    """Grava um objeto JSON por linha (newline-delimited JSON)."""
+
+    def write_batch(self, rows: List[Sequence]):
+        if self._file is None:
+            self._open()
+        self._file.writelines(json.dumps(dict(zip(EVENT_HEADERS, row))) + "\n" for row in rows)
+
+
+class SqliteEventSink(EventSink):
+    """Grava eventos no banco indexado de sessões (SessionStore).
+
+    A conexão é aberta no primeiro lote, ou seja, na thread que escreve.
+    Com 'publish' cada evento gravado é publicado no event_bus já com o id
+    da linha, que o dashboard usa como cursor (after_id) para ressincronizar.
+    Com 'session_id', 'close' marca a sessão como encerrada no banco.
+    """
+
+    def __init__(self, path: str = SESSIONS_DB_PATH, publish: bool = False, session_id: Optional[str] = None):
+        self.path = path
+        self.publish = publish
+        self.session_id = session_id
+        self._store = None
+
+    def write_batch(self, rows: List[Sequence]):
+        if self._store is None:
+            self._store = SessionStore(self.path)
+        ids = self._store.insert_events(rows)
+        if self.publish:
+            for event_id, row in zip(ids, rows):
+                event_bus.publish({"id": event_id, **dict(zip(EVENT_HEADERS, row))})
+
+    def close(self):
+        if self._store is not None:
+            if self.session_id is not None:
+                self._store.close_session(self.session_id)
+            self._store.close()
+            self._store = None
+
+
+class SqliteMetricSink(SqliteEventSink):
+    """Grava amostras de métricas (METRIC_HEADERS) na tabela de métricas do banco de sessões."""
+
+    def write_batch(self, rows: List[Sequence]):
+        if self._store is None:
+            self._store = SessionStore(self.path)
+        self._store.insert_metrics(rows)
+
+
+class MemoryEventSink(EventSink):
+    """Acumula as linhas numa lista (ex.: reprodução de gravações, sem disco)."""
+
+    def __init__(self):
+        self.rows: List[Sequence] = []
+
+    def write(self, row: Sequence):
+        self.rows.append(row)
+
+    def write_batch(self, rows: List[Sequence]):
+        self.rows.extend(rows)
+
+
+class MultiSink(EventSink):
+    """Repassa cada lote para vários destinos (ex.: banco indexado + CSV de relatório)."""
+
+    def __init__(self, sinks: List[EventSink]):
+        self.sinks = sinks
+
+    def write_batch(self, rows: List[Sequence]):
+        for sink in self.sinks:
+            sink.write_batch(rows)
+
+    def flush(self, fsync: bool = False):
+        for sink in self.sinks:
+            sink.flush(fsync)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+class AsyncEventWriter(EventSink):
+    """Envolve outro destino e grava em lotes numa thread em segundo plano.
+
+    'write' apenas enfileira, então a thread de detecção nunca espera pelo
+    disco. O lote é gravado quando atinge 'batch_size' ou a cada
+    'flush_interval' segundos; 'close' (também chamado na saída do processo)
+    grava o que restar. 'name' rotula as métricas de escrita em /metrics.
+    """
+
+    _STOP = object()
+
+    def __init__(self, sink: EventSink, batch_size: int = 64, flush_interval: float = 1.0,
+                 fsync: bool = True, name: str = "events"):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._queue: "queue.Queue" = queue.Queue()
+        self._write_latency = telemetry.histogram("sink_write_seconds", "Tempo de gravação de um lote de eventos",
+                                                  writer=name)
+        self._rows_written = telemetry.counter("sink_rows_total", "Eventos gravados no destino", writer=name)
+        self._errors = telemetry.counter("sink_errors_total", "Lotes que falharam ao gravar", writer=name)
+        telemetry.gauge("sink_queue_depth", "Eventos aguardando gravação", fn=self._queue.qsize, writer=name)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, row: Sequence):
+        self._queue.put(row)
+
+    def write_batch(self, rows: Iterable[Sequence]):
+        for row in rows:
+            self._queue.put(row)
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            stop = item is self._STOP
+            if item is not None and not stop:
+                batch.append(item)
+                if len(batch) < self.batch_size and time.monotonic() < deadline:
+                    continue
+
+            if batch:
+                self._write(batch)
+                batch = []
+            deadline = time.monotonic() + self.flush_interval
+            if stop:
+                break
+
+        # Fecha na própria thread de escrita (conexões SQLite são presas à thread)
+        self.sink.close()
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        try:
+            self.sink.write_batch(batch)
+            self.sink.flush(self.fsync)
+        except Exception as e:
+            # Uma falha de disco não pode derrubar a thread de escrita
+            self._errors.inc()
+            print(f"Erro ao gravar {len(batch)} eventos: {e}")
+            return
+        self._write_latency.observe(time.perf_counter() - start)
+        self._rows_written.inc(len(batch))
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
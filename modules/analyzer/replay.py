@@ -0,0 +1,174 @@
+"""Reprodução de gravações por frame (FrameRecorder) com outros limiares.
+
+Roda DrowsinessMonitor e EventLogger (sem disco, dashboard ou telemetria)
+sobre os registros mapeados em memória, sem passar pelo dlib, o que permite
+testar combinações de limiares sobre uma frota inteira de gravações.
+
+Exemplo:
+    python -m modules.analyzer.replay reports/recordings/* --ear 0.18 0.2 0.22 --mar 0.5 0.6
+"""
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from modules.analyzer.drowsiness_monitor import DrowsinessMonitor
+from modules.analyzer.event_logger import EventLogger
+from modules.analyzer.event_sinks import MemoryEventSink
+from modules.detector.landmarks import FaceMeasurement
+from modules.storage.frame_recorder import FrameRecording
+
+SWEEP_HEADERS = ["recording", "session_id", "ear_threshold", "mar_threshold", "frames", "duration_seconds",
+                 "olhos", "bocejo", "risk_alerts", "replay_seconds", "speedup"]
+
+
+class BoxRect:
+    """Retângulo gravado com a interface do dlib.rectangle usada pelo monitor."""
+    __slots__ = ("_left", "_top", "_right", "_bottom")
+
+    def __init__(self, left, top, right, bottom):
+        self._left, self._top, self._right, self._bottom = left, top, right, bottom
+
+    def left(self):
+        return self._left
+
+    def top(self):
+        return self._top
+
+    def right(self):
+        return self._right
+
+    def bottom(self):
+        return self._bottom
+
+    def width(self):
+        return self._right - self._left
+
+    def height(self):
+        return self._bottom - self._top
+
+
+def iter_frames(recording: FrameRecording) -> Iterator[Tuple[float, List[FaceMeasurement]]]:
+    """Gera (timestamp, rostos do frame) em ordem, reagrupando as linhas por frame_index."""
+    fields = ("frame_index", "timestamp", "track_id", "left", "top", "right", "bottom", "ear", "mar")
+    current = None
+    timestamp = None
+    faces: List[FaceMeasurement] = []
+    for chunk in recording.chunks():
+        # Uma conversão por coluna é bem mais rápida que acessar o memmap linha a linha
+        for index, ts, track_id, left, top, right, bottom, ear, mar in zip(*(chunk[f].tolist() for f in fields)):
+            if index != current:
+                if current is not None:
+                    yield timestamp, faces
+                current, timestamp, faces = index, ts, []
+            if track_id >= 0:
+                faces.append(FaceMeasurement(BoxRect(left, top, right, bottom), None, ear, mar))
+    if current is not None:
+        yield timestamp, faces
+
+
+def replay_recording(directory: str, ear_threshold: Optional[float] = None, mar_threshold: Optional[float] = None,
+                     eye_closed_threshold: float = 2.0, mouth_open_threshold: float = 2.0,
+                     min_events: int = 3) -> dict:
+    """Reaplica a lógica de limiares a uma gravação; sem limiares usa os da própria gravação."""
+    recording = FrameRecording(directory)
+    meta = recording.meta
+    ear_threshold = ear_threshold if ear_threshold is not None else meta.get("ear_threshold", 0.25)
+    mar_threshold = mar_threshold if mar_threshold is not None else meta.get("mar_threshold", 0.5)
+    session_id = meta.get("session_id") or os.path.basename(os.path.normpath(directory))
+
+    sink = MemoryEventSink()
+    event_logger = EventLogger(session_id, ear_threshold, mar_threshold, csv_path=None, db_path=None,
+                               sink=sink, live=False)
+    monitor = DrowsinessMonitor(event_logger, eye_closed_threshold, mouth_open_threshold, min_events)
+
+    start = time.perf_counter()
+    frames = 0
+    risk_alerts = 0
+    at_risk = False
+    first_timestamp = last_timestamp = None
+    for timestamp, faces in iter_frames(recording):
+        monitor.process(faces, timestamp)
+        risk = monitor.is_at_risk(timestamp)
+        if risk and not at_risk:
+            risk_alerts += 1
+        at_risk = risk
+        frames += 1
+        if first_timestamp is None:
+            first_timestamp = timestamp
+        last_timestamp = timestamp
+    elapsed = time.perf_counter() - start
+    event_logger.close()
+
+    duration = (last_timestamp - first_timestamp) if frames else 0.0
+    return {
+        "recording": directory,
+        "session_id": session_id,
+        "ear_threshold": ear_threshold,
+        "mar_threshold": mar_threshold,
+        "frames": frames,
+        "duration_seconds": duration,
+        "olhos": event_logger.summary.counts.get("olhos", 0),
+        "bocejo": event_logger.summary.counts.get("bocejo", 0),
+        "risk_alerts": risk_alerts,
+        "replay_seconds": elapsed,
+        "speedup": duration / elapsed if elapsed > 0 else None,
+        "events": sink.rows,
+        "summary": event_logger.summary.to_dict(),
+    }
+
+
+def _replay_star(args):
+    result = replay_recording(*args)
+    return [result[header] for header in SWEEP_HEADERS]
+
+
+def sweep(directories: List[str], ear_thresholds: List[Optional[float]], mar_thresholds: List[Optional[float]],
+          eye_closed_threshold: float = 2.0, mouth_open_threshold: float = 2.0, min_events: int = 3,
+          workers: Optional[int] = None) -> List[list]:
+    """Reproduz cada gravação com cada par de limiares, em paralelo; retorna linhas SWEEP_HEADERS."""
+    tasks = [(directory, ear, mar, eye_closed_threshold, mouth_open_threshold, min_events)
+             for directory, ear, mar in itertools.product(directories, ear_thresholds, mar_thresholds)]
+    if len(tasks) == 1:
+        return [_replay_star(tasks[0])]
+    with multiprocessing.Pool(min(workers or os.cpu_count(), len(tasks))) as pool:
+        return pool.map(_replay_star, tasks)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Reanalisa gravações por frame com outros limiares.")
+    parser.add_argument("recordings", nargs="+", help="Diretórios de gravação (com meta.json)")
+    parser.add_argument("--ear", type=float, nargs="+", default=[None],
+                        help="Limiares EAR a testar (padrão: o da gravação)")
+    parser.add_argument("--mar", type=float, nargs="+", default=[None],
+                        help="Limiares MAR a testar (padrão: o da gravação)")
+    parser.add_argument("--eye-closed-seconds", type=float, default=2.0)
+    parser.add_argument("--mouth-open-seconds", type=float, default=2.0)
+    parser.add_argument("--min-events", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None, help="Processos (padrão: número de núcleos)")
+    parser.add_argument("--output", default=None, help="CSV de saída (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    directories = [path for path in args.recordings if FrameRecording.is_recording(path)]
+    if not directories:
+        print("Nenhuma gravação encontrada.")
+        return 1
+    rows = sweep(directories, args.ear, args.mar, args.eye_closed_seconds, args.mouth_open_seconds,
+                 args.min_events, args.workers)
+
+    file = open(args.output, "w", newline="") if args.output else sys.stdout
+    writer = csv.writer(file)
+    writer.writerow(SWEEP_HEADERS)
+    writer.writerows(rows)
+    if args.output:
+        file.close()
+        print(f"{len(rows)} reproduções gravadas em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
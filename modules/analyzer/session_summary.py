@@ -0,0 +1,117 @@
+import threading
+from collections import Counter, deque
+from typing import Dict, Iterable, Optional
+
+
+class SessionSummary:
+    """Agregados de uma sessão mantidos de forma incremental, evento a evento.
+
+    Guarda contagem por tipo, histograma de eventos por minuto, estatísticas
+    da métrica por tipo e o pico de eventos dentro da janela de risco, sem
+    precisar reler os eventos brutos.
+    """
+
+    def __init__(self, session_id: str, risk_window: float = 30.0):
+        self.session_id = session_id
+        self.risk_window = risk_window
+        self.counts: Dict[str, int] = Counter()
+        self.per_minute: Dict[int, int] = Counter() # minuto desde o primeiro evento -> eventos
+        self.metrics: Dict[str, list] = {} # tipo -> [count, soma, min, max]
+        self.metric_samples: Dict[str, list] = {} # métricas contínuas (PERCLOS...) -> [count, soma, min, max, último]
+        self.first_timestamp: Optional[float] = None
+        self.last_timestamp: Optional[float] = None
+        self.risk_peak = 0
+        self.risk_peak_timestamp: Optional[float] = None
+        self._window = deque()
+        self._lock = threading.Lock()
+
+    def add(self, event_type: str, timestamp: float, metric_value: Optional[float]):
+        with self._lock:
+            if self.first_timestamp is None:
+                self.first_timestamp = timestamp
+            self.last_timestamp = timestamp
+            self.counts[event_type] += 1
+            self.per_minute[int((timestamp - self.first_timestamp) // 60)] += 1
+
+            if metric_value is not None:
+                stats = self.metrics.get(event_type)
+                if stats is None:
+                    self.metrics[event_type] = [1, metric_value, metric_value, metric_value]
+                else:
+                    stats[0] += 1
+                    stats[1] += metric_value
+                    stats[2] = min(stats[2], metric_value)
+                    stats[3] = max(stats[3], metric_value)
+
+            # Pico da janela de risco: eventos nos últimos 'risk_window' segundos
+            self._window.append(timestamp)
+            while timestamp - self._window[0] > self.risk_window:
+                self._window.popleft()
+            if len(self._window) > self.risk_peak:
+                self.risk_peak = len(self._window)
+                self.risk_peak_timestamp = timestamp
+
+    def add_metric(self, name: str, timestamp: float, value: float):
+        """Agrega uma amostra de métrica contínua; não conta como evento nem na janela de risco."""
+        with self._lock:
+            stats = self.metric_samples.get(name)
+            if stats is None:
+                self.metric_samples[name] = [1, value, value, value, value]
+            else:
+                stats[0] += 1
+                stats[1] += value
+                stats[2] = min(stats[2], value)
+                stats[3] = max(stats[3], value)
+                stats[4] = value
+
+    @classmethod
+    def from_events(cls, session_id: str, events: Iterable[dict], metrics: Iterable[dict] = (),
+                    risk_window: float = 30.0):
+        """Monta o resumo a partir de eventos e amostras de métricas já gravados (em ordem cronológica)."""
+        summary = cls(session_id, risk_window)
+        for event in events:
+            summary.add(event['event_type'], event['timestamp'], event['metric_value'])
+        for sample in metrics:
+            summary.add_metric(sample['name'], sample['timestamp'], sample['value'])
+        return summary
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            duration = (self.last_timestamp - self.first_timestamp) if self.first_timestamp is not None else 0.0
+            return {
+                "session_id": self.session_id,
+                "total_events": sum(self.counts.values()),
+                "counts": dict(self.counts),
+                "first_timestamp": self.first_timestamp,
+                "last_timestamp": self.last_timestamp,
+                "duration_seconds": duration,
+                "events_per_minute": [
+                    {"minute": minute, "count": count} for minute, count in sorted(self.per_minute.items())
+                ],
+                "metrics": {
+                    event_type: {"count": count, "mean": total / count, "min": low, "max": high}
+                    for event_type, (count, total, low, high) in self.metrics.items()
+                },
+                "fatigue_metrics": {
+                    name: {"samples": count, "mean": total / count, "min": low, "max": high, "last": last}
+                    for name, (count, total, low, high, last) in self.metric_samples.items()
+                },
+                "risk_window_seconds": self.risk_window,
+                "risk_peak": {"events": self.risk_peak, "timestamp": self.risk_peak_timestamp},
+            }
+
+
+# Resumos das sessões ainda abertas neste processo (mantidos pelo EventLogger)
+_live_summaries: Dict[str, SessionSummary] = {}
+
+
+def register_live_summary(summary: SessionSummary):
+    _live_summaries[summary.session_id] = summary
+
+
+def unregister_live_summary(session_id: str):
+    _live_summaries.pop(session_id, None)
+
+
+def get_live_summary(session_id: str) -> Optional[SessionSummary]:
+    return _live_summaries.get(session_id)
@@ -0,0 +1,108 @@
+from typing import Optional
+
+import numpy as np
+
+# Nomes com que as métricas contínuas são registradas no EventLogger (no lugar do event_type)
+METRIC_NAMES = ("perclos", "blink_rate", "blink_duration", "ear_ema")
+
+
+class TimeWindowBuffer:
+    """Buffer circular de (timestamp, valor) com soma corrente, podado por tempo.
+
+    'push' e 'prune' custam O(1) amortizado; se a capacidade estourar antes
+    da janela (FPS acima do previsto) o item mais antigo é descartado.
+    """
+
+    def __init__(self, window: float, capacity: int):
+        self.window = window
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.capacity = capacity
+        self.head = 0 # índice do item mais antigo
+        self.size = 0
+        self.total = 0.0
+
+    def push(self, timestamp: float, value: float):
+        if self.size == self.capacity:
+            self._pop()
+        tail = (self.head + self.size) % self.capacity
+        self.timestamps[tail] = timestamp
+        self.values[tail] = value
+        self.size += 1
+        self.total += value
+
+    def _pop(self):
+        self.total -= self.values[self.head]
+        self.head = (self.head + 1) % self.capacity
+        self.size -= 1
+
+    def prune(self, current_time: float):
+        """Descarta os itens mais antigos que 'window' segundos."""
+        cutoff = current_time - self.window
+        while self.size and self.timestamps[self.head] < cutoff:
+            self._pop()
+        if self.size == 0:
+            self.total = 0.0 # evita acúmulo de erro de ponto flutuante
+
+    def mean(self) -> float:
+        return float(self.total / self.size) if self.size else 0.0
+
+
+class StreamingMetrics:
+    """Indicadores de fadiga calculados incrementalmente a cada frame.
+
+    - PERCLOS: fração dos frames com olhos fechados na janela móvel
+    - taxa de piscadas (por minuto) e duração média das piscadas
+    - EAR suavizado por média móvel exponencial
+
+    Cada 'update' custa O(1): nada é recalculado sobre o histórico.
+    """
+
+    def __init__(self, ear_threshold: float, perclos_window: float = 60.0, blink_window: float = 60.0,
+                 ema_alpha: float = 0.3, min_blink_duration: float = 0.05, max_blink_duration: float = 0.5,
+                 max_fps: int = 60):
+        self.ear_threshold = ear_threshold
+        self.ema_alpha = ema_alpha
+        self.min_blink_duration = min_blink_duration
+        self.max_blink_duration = max_blink_duration
+        self.blink_window = blink_window
+        self._closed = TimeWindowBuffer(perclos_window, int(perclos_window * max_fps))
+        # Uma piscada dura pelo menos 'min_blink_duration', o que limita quantas cabem na janela
+        self._blinks = TimeWindowBuffer(blink_window, int(blink_window / min_blink_duration) + 1)
+        self.ear_ema: Optional[float] = None
+        self._closed_since: Optional[float] = None
+        self.last_timestamp: Optional[float] = None
+
+    def update(self, ear: float, timestamp: float):
+        if self.ear_ema is None:
+            self.ear_ema = ear
+        else:
+            self.ear_ema += self.ema_alpha * (ear - self.ear_ema)
+
+        closed = ear < self.ear_threshold
+        self._closed.push(timestamp, 1.0 if closed else 0.0)
+
+        # Piscada: transição fechado -> aberto com duração plausível
+        if closed:
+            if self._closed_since is None:
+                self._closed_since = timestamp
+        elif self._closed_since is not None:
+            duration = timestamp - self._closed_since
+            if self.min_blink_duration <= duration <= self.max_blink_duration:
+                self._blinks.push(timestamp, duration)
+            self._closed_since = None
+
+        self.last_timestamp = timestamp
+
+    def snapshot(self, current_time: Optional[float] = None) -> dict:
+        """PERCLOS, taxa e duração média das piscadas e EAR suavizado no instante dado."""
+        if current_time is None:
+            current_time = self.last_timestamp or 0.0
+        self._closed.prune(current_time)
+        self._blinks.prune(current_time)
+        return {
+            "perclos": self._closed.mean(),
+            "blink_rate": self._blinks.size * 60.0 / self.blink_window,
+            "blink_duration": self._blinks.mean(),
+            "ear_ema": self.ear_ema if self.ear_ema is not None else 0.0,
+        }
@@ -2,6 +2,37 @@ import numpy as np
 import time
 from collections import deque
 
+# Valores padrão caso não haja amostras
+DEFAULT_EAR_THRESHOLD = 0.25
+DEFAULT_MAR_THRESHOLD = 0.5
+# EAR acima disso indica olhos visivelmente abertos
+OPEN_EYE_EAR = 0.22
+
+
+def thresholds_from_percentiles(ear_p25, mar_p75):
+    """Limiares a partir do percentil 25 do EAR com olhos abertos e do percentil 75 do MAR em repouso.
+
+    Compartilhado pela calibração ao vivo e pela offline; None usa o valor padrão.
+    """
+    ear_thresh = ear_p25 * 0.8 if ear_p25 is not None else DEFAULT_EAR_THRESHOLD
+    mar_thresh = mar_p75 * 1.8 if mar_p75 is not None else DEFAULT_MAR_THRESHOLD
+
+    # Limites de segurança
+    ear_thresh = max(0.15, min(float(ear_thresh), 0.3))
+    mar_thresh = max(0.3, min(float(mar_thresh), 0.7))
+    return ear_thresh, mar_thresh
+
+
+def thresholds_from_samples(ear_samples, mar_samples):
+    """Limiares EAR/MAR a partir das amostras brutas (só EAR > OPEN_EYE_EAR conta para o olho aberto)."""
+    ear_samples = np.asarray(ear_samples, dtype=np.float64)
+    mar_samples = np.asarray(mar_samples, dtype=np.float64)
+    open_eyes = ear_samples[ear_samples > OPEN_EYE_EAR]
+    ear_p25 = np.percentile(open_eyes, 25) if open_eyes.size else None
+    mar_p75 = np.percentile(mar_samples, 75) if mar_samples.size else None
+    return thresholds_from_percentiles(ear_p25, mar_p75)
+
+
 class Calibrator:
     def __init__(self):
         self.ear_resting = deque(maxlen=30)
@@ -31,7 +62,7 @@ class Calibrator:
         if not self.calibration_done:
             if self.current_phase == 0:
                 # Apenas adiciona amostras de EAR se os olhos estiverem visivelmente abertos
-                if ear > 0.22:
+                if ear > OPEN_EYE_EAR:
                     self.ear_resting.append(ear)
                 self.mar_resting.append(mar)
             elif self.current_phase == 1 and ear < 0.2:
@@ -40,18 +71,7 @@ class Calibrator:
                 self.mar_active.append(mar)
 
     def calculate_thresholds(self):
-        # Valores padrão caso as listas estejam vazias
-        default_ear = 0.25
-        default_mar = 0.5
-        
         try:
-            ear_thresh = np.percentile(list(self.ear_resting), 25) * 0.8 if self.ear_resting else default_ear
-            mar_thresh = np.percentile(list(self.mar_resting), 75) * 1.8 if self.mar_resting else default_mar
-            
-            # Limites de segurança
-            ear_thresh = max(0.15, min(ear_thresh, 0.3))
-            mar_thresh = max(0.3, min(mar_thresh, 0.7))
-            
-            return ear_thresh, mar_thresh
+            return thresholds_from_samples(self.ear_resting, self.mar_resting)
         except:
-            return default_ear, default_mar
\ No newline at end of file
+            return DEFAULT_EAR_THRESHOLD, DEFAULT_MAR_THRESHOLD
\ No newline at end of file
@@ -0,0 +1,260 @@
+"""Calibração offline: limiares EAR/MAR por motorista a partir de dados gravados.
+
+Cada subdiretório de uma raiz é um motorista (o nome é o driver_id) com
+gravações por frame (FrameRecorder) ou dumps de landmarks '.npy' de sessões
+anteriores, em (N, 68, 2) ou já como colunas (N, 2) de EAR e MAR; gravações
+soltas na raiz (ex.: reports/recordings) usam o driver_id do seu meta.json.
+Os percentis saem de histogramas de bins fixos, acumulados em blocos
+vetorizados (memória constante mesmo com horas de gravação), e os motoristas
+são processados em paralelo. O resultado fica em cache por driver_id e é
+usado pelo main.py no lugar da calibração ao vivo.
+
+Exemplo:
+    python -m modules.calibrator.offline_calibration reports/recordings reports/landmarks --workers 4
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from modules.calibrator.calibrator import OPEN_EYE_EAR, thresholds_from_percentiles
+from modules.detector.landmarks import average_ear, mouth_aspect_ratio
+from modules.storage.frame_recorder import FrameRecording
+
+CALIBRATION_CACHE_PATH = os.path.join("reports", "calibration_cache.json")
+SOURCE_EXTENSIONS = (".npy",)
+CHUNK_FRAMES = 65536
+
+
+class MetricHistogram:
+    """Histograma de bins fixos que aproxima percentis sem guardar as amostras.
+
+    Com 0,0002 de largura de bin o erro do percentil fica abaixo da precisão
+    com que os limiares são usados. Histogramas de blocos diferentes somam.
+    """
+
+    def __init__(self, low: float, high: float, bins: int):
+        self.low = low
+        self.width = (high - low) / bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        index = ((values - self.low) / self.width).astype(np.int64)
+        np.clip(index, 0, len(self.counts) - 1, out=index)
+        self.counts += np.bincount(index, minlength=len(self.counts))
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Percentil 'q' (0-100) com interpolação linear dentro do bin; None sem amostras."""
+        total = self.total
+        if total == 0:
+            return None
+        cumulative = np.cumsum(self.counts)
+        target = max(q / 100.0 * total, 1e-9)
+        i = int(np.searchsorted(cumulative, target, side="left"))
+        before = cumulative[i - 1] if i else 0
+        return self.low + (i + (target - before) / self.counts[i]) * self.width
+
+
+def driver_track_id(recording: FrameRecording) -> Optional[int]:
+    """Trilha do motorista numa gravação: a com mais linhas (o rosto presente por mais tempo)."""
+    counts: Dict[int, int] = {}
+    for chunk in recording.chunks():
+        track_ids, track_counts = np.unique(chunk["track_id"], return_counts=True)
+        for track_id, count in zip(track_ids.tolist(), track_counts.tolist()):
+            if track_id >= 0: # -1 marca frames sem rosto
+                counts[track_id] = counts.get(track_id, 0) + count
+    return max(counts, key=counts.get) if counts else None
+
+
+def iter_metric_chunks(path: str, chunk_frames: int = CHUNK_FRAMES) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Gera blocos (EAR, MAR) de uma gravação ou arquivo '.npy', lidos via memmap.
+
+    Numa gravação só entram as linhas da trilha do motorista: passageiros
+    distorceriam os limiares dele.
+    """
+    if FrameRecording.is_recording(path):
+        recording = FrameRecording(path)
+        driver = driver_track_id(recording)
+        if driver is None:
+            return
+        for chunk in recording.chunks():
+            faces = chunk[chunk["track_id"] == driver]
+            for start in range(0, len(faces), chunk_frames):
+                block = faces[start:start + chunk_frames]
+                yield block["ear"].astype(np.float64), block["mar"].astype(np.float64)
+        return
+
+    data = np.load(path, mmap_mode="r")
+    if data.ndim == 3 and data.shape[1:] == (68, 2):
+        for start in range(0, len(data), chunk_frames):
+            chunk = np.asarray(data[start:start + chunk_frames])
+            yield average_ear(chunk), mouth_aspect_ratio(chunk)
+    elif data.ndim == 2 and data.shape[1] == 2:
+        for start in range(0, len(data), chunk_frames):
+            chunk = np.asarray(data[start:start + chunk_frames], dtype=np.float64)
+            yield chunk[:, 0], chunk[:, 1]
+    else:
+        raise ValueError(f"{path}: formato {data.shape} não reconhecido (esperado (N, 68, 2) ou (N, 2))")
+
+
+def find_driver_sources(roots: List[str]) -> Dict[str, List[str]]:
+    """Mapeia driver_id (nome do subdiretório ou do meta.json) -> fontes gravadas desse motorista."""
+    sources: Dict[str, List[str]] = {}
+    for root in roots:
+        for driver_id in sorted(os.listdir(root)):
+            driver_dir = os.path.join(root, driver_id)
+            if FrameRecording.is_recording(driver_dir):
+                recorded_driver = FrameRecording(driver_dir).meta.get("driver_id")
+                if recorded_driver:
+                    sources.setdefault(recorded_driver, []).append(driver_dir)
+                continue
+            if not os.path.isdir(driver_dir):
+                continue
+            for dirpath, dirnames, filenames in os.walk(driver_dir):
+                if FrameRecording.is_recording(dirpath):
+                    sources.setdefault(driver_id, []).append(dirpath)
+                    dirnames[:] = []
+                    continue
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if filename.lower().endswith(SOURCE_EXTENSIONS):
+                        sources.setdefault(driver_id, []).append(os.path.join(dirpath, filename))
+    return sources
+
+
+def _signature(paths: List[str]) -> List[list]:
+    """Identifica o conteúdo das fontes (caminho, tamanho, mtime) para invalidar o cache."""
+    signature = []
+    for path in sorted(paths):
+        files = FrameRecording(path).chunk_paths if FrameRecording.is_recording(path) else [path]
+        signature.append([path, sum(os.path.getsize(f) for f in files),
+                          max((os.stat(f).st_mtime_ns for f in files), default=0)])
+    return signature
+
+
+def calibrate_driver(driver_id: str, paths: List[str]) -> dict:
+    """Limiares de um motorista a partir de todas as suas gravações.
+
+    Como na fase de repouso da calibração ao vivo, o EAR considera só os
+    frames de olhos abertos; o MAR de repouso também vem desses frames.
+    """
+    ear_histogram = MetricHistogram(0.0, 0.6, 3000)
+    mar_histogram = MetricHistogram(0.0, 1.5, 7500)
+    frames = 0
+    for path in paths:
+        for ear, mar in iter_metric_chunks(path):
+            frames += len(ear)
+            resting = ear > OPEN_EYE_EAR
+            ear_histogram.add(ear[resting])
+            mar_histogram.add(mar[resting])
+
+    ear_p25 = ear_histogram.percentile(25)
+    mar_p75 = mar_histogram.percentile(75)
+    ear_threshold, mar_threshold = thresholds_from_percentiles(ear_p25, mar_p75)
+    return {
+        "driver_id": driver_id,
+        "ear_threshold": ear_threshold,
+        "mar_threshold": mar_threshold,
+        "ear_p25": ear_p25,
+        "mar_p75": mar_p75,
+        "frames": frames,
+        "resting_frames": ear_histogram.total,
+        "sources": _signature(paths),
+        "calibrated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def _calibrate_driver_star(args):
+    return calibrate_driver(*args)
+
+
+def load_cache(cache_path: str = CALIBRATION_CACHE_PATH) -> Dict[str, dict]:
+    if not os.path.exists(cache_path):
+        return {}
+    with open(cache_path) as file:
+        return json.load(file)
+
+
+def save_cache(cache: Dict[str, dict], cache_path: str = CALIBRATION_CACHE_PATH):
+    """Grava o cache de forma atômica (arquivo temporário + rename)."""
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    temp_path = cache_path + ".tmp"
+    with open(temp_path, "w") as file:
+        json.dump(cache, file, indent=2)
+    os.replace(temp_path, cache_path)
+
+
+def load_cached_thresholds(driver_id: str, cache_path: str = CALIBRATION_CACHE_PATH) -> Optional[Tuple[float, float]]:
+    """(EAR, MAR) calibrados offline para o motorista, ou None se ele não estiver no cache."""
+    entry = load_cache(cache_path).get(driver_id)
+    if entry is None:
+        return None
+    return entry["ear_threshold"], entry["mar_threshold"]
+
+
+def calibrate_drivers(sources: Dict[str, List[str]], workers: Optional[int] = None,
+                      cache_path: str = CALIBRATION_CACHE_PATH, min_frames: int = 300,
+                      force: bool = False) -> Dict[str, dict]:
+    """Calibra os motoristas em paralelo (um processo por motorista) e atualiza o cache.
+
+    Motoristas cujas fontes não mudaram desde a última execução são pulados,
+    a menos que 'force' seja True. Retorna apenas os recalibrados.
+    """
+    cache = load_cache(cache_path)
+    tasks = [(driver_id, paths) for driver_id, paths in sorted(sources.items())
+             if force or cache.get(driver_id, {}).get("sources") != _signature(paths)]
+    if not tasks:
+        return {}
+
+    if len(tasks) == 1:
+        results = [calibrate_driver(*tasks[0])]
+    else:
+        with multiprocessing.Pool(min(workers or os.cpu_count(), len(tasks))) as pool:
+            results = pool.map(_calibrate_driver_star, tasks)
+
+    updated = {}
+    for result in results:
+        if result["resting_frames"] < min_frames:
+            print(f"{result['driver_id']}: apenas {result['resting_frames']} frames de olhos abertos, ignorado")
+            continue
+        updated[result["driver_id"]] = cache[result["driver_id"]] = result
+    save_cache(cache, cache_path)
+    return updated
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Calibra limiares EAR/MAR por motorista a partir de gravações.")
+    parser.add_argument("roots", nargs="+", help="Diretórios com um subdiretório por motorista")
+    parser.add_argument("--workers", type=int, default=None, help="Processos (padrão: número de núcleos)")
+    parser.add_argument("--cache", default=CALIBRATION_CACHE_PATH)
+    parser.add_argument("--min-frames", type=int, default=300,
+                        help="Mínimo de frames de olhos abertos para aceitar a calibração")
+    parser.add_argument("--force", action="store_true", help="Recalibra mesmo motoristas já em cache")
+    args = parser.parse_args(argv)
+
+    sources = find_driver_sources(args.roots)
+    if not sources:
+        print("Nenhuma gravação encontrada.")
+        return 1
+    updated = calibrate_drivers(sources, args.workers, args.cache, args.min_frames, args.force)
+    for driver_id, result in updated.items():
+        print(f"{driver_id}: EAR {result['ear_threshold']:.3f}, MAR {result['mar_threshold']:.3f}"
+              f" ({result['resting_frames']}/{result['frames']} frames)")
+    print(f"{len(updated)} motoristas recalibrados, {len(sources) - len(updated)} sem mudança ou ignorados."
+          f" Cache: {args.cache}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,66 +1,244 @@
+import copy
 import cv2
-import dlib
 import os
-import scipy.spatial.distance as distance
+import time
+import numpy as np
+from modules.detector.landmarks import FaceMeasurement, shape_to_np, eye_aspect_ratios, mouth_aspect_ratio
+from modules.detector.model_registry import SHAPE_PREDICTOR_PATH, get_face_detector, get_shape_predictor
+from modules.telemetry.telemetry import telemetry
+
+# Latência das etapas internas do analyze (compartilhada por todas as instâncias)
+_DETECTION_LATENCY = telemetry.histogram("detector_latency_seconds", "Latência das etapas do FaceDetector",
+                                         step="detection")
+_LANDMARKS_LATENCY = telemetry.histogram("detector_latency_seconds", "Latência das etapas do FaceDetector",
+                                         step="landmarks")
+
+# Janela do detector HOG do dlib (~80x80 px): rostos menores no frame de busca não são encontrados
+HOG_MIN_FACE_SIZE = 80
+# Folga sobre a janela mínima, para rostos que encolhem um pouco entre frames
+HOG_FACE_MARGIN = 1.1
 
 class FaceDetector:
-    def __init__(self):
-        self.detector = dlib.get_frontal_face_detector()
-        
+    def __init__(self, detection_interval=5, roi_padding=0.5, model_path=SHAPE_PREDICTOR_PATH,
+                 detection_scale=1.0, min_face_fraction=0.2):
         self.LEFT_EYE_POINTS = [36, 37, 38, 39, 40, 41]  # Landmarks do olho esquerdo
         self.RIGHT_EYE_POINTS = [42, 43, 44, 45, 46, 47]  # Landmarks do olho direito
         
         self.MOUTH_POINTS = [48, 49, 50, 51, 52, 53, 54, 55, 56, 57, 58, 59]  # Landmarks da boca
         
-        # Carrega o modelo de landmarks (caminho relativo à raiz do projeto)
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(current_dir, "../..", "models", "shape_predictor_68_face_landmarks.dat")
-        
+        # Os modelos vêm do registro: o preditor de landmarks é carregado uma vez e
+        # compartilhado por todas as instâncias; o detector HOG é um por thread
+        self.model_path = model_path
         if not os.path.exists(model_path):
-            raise FileNotFoundError(f"Modelo de landmarks não encontrado em: {model_path}")
-        
-        self.predictor = dlib.shape_predictor(model_path)
-        
+            raise FileNotFoundError(f"Modelo de landmarks não encontrado em: {os.path.normpath(model_path)}")
+
+        # Rastreamento: detecção completa a cada 'detection_interval' frames,
+        # nos demais busca apenas numa região ampliada ao redor do último rosto
+        self.detection_interval = detection_interval
+        self.roi_padding = roi_padding
+        self._last_faces = []
+        self._frames_since_detection = 0
+
+        # Escala do frame usado na busca de rostos (ajustada pelo FrameGovernor);
+        # os retângulos voltam à resolução original antes dos landmarks. A escala
+        # usada nunca fica abaixo de 'scale_floor()': sem rosto rastreado, o menor
+        # rosto esperado é 'min_face_fraction' do lado menor do frame
+        self.detection_scale = detection_scale
+        self.min_face_fraction = min_face_fraction
+        self._frame_size = None
         
+    @property
+    def detector(self):
+        """Detector HOG da thread atual (o dlib não aceita chamadas concorrentes)."""
+        return get_face_detector()
+
+    @property
+    def predictor(self):
+        return get_shape_predictor(self.model_path)
+
+    # converte o frame para escala de cinza
+    def to_gray(self, frame):
+        """Converte o frame BGR para escala de cinza (fazer uma única vez por frame)."""
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
     # detecta rostos em um frame
-    def detect_faces(self, frame):
+    def detect_faces(self, frame, gray=None):
         """Detecta rostos em um frame usando dlib."""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if gray is None:
+            gray = self.to_gray(frame)
         faces = self.detector(gray)
         return faces
-      
+
+    # detecta rostos reaproveitando a posição do frame anterior
+    def track_faces(self, frame, gray=None):
+        """Detecta rostos no modo rastreamento.
+
+        A detecção HOG no frame inteiro só roda a cada 'detection_interval'
+        frames ou quando o rastreamento é perdido; nos demais frames a busca
+        é feita apenas na região de interesse ao redor dos últimos rostos.
+        Com 'detection_scale' < 1 a busca roda numa cópia reduzida do frame,
+        limitada por 'scale_floor()' para que os rostos continuem detectáveis.
+        """
+        if gray is None:
+            gray = self.to_gray(frame)
+
+        self._frame_size = gray.shape[:2]
+        scale = max(self.detection_scale, self.scale_floor())
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        if self._last_faces and self._frames_since_detection < self.detection_interval:
+            faces = self._search_rois(gray, scale)
+            if faces:
+                self._last_faces = faces
+                self._frames_since_detection += 1
+                return faces
+
+        faces = list(self.detector(gray))
+        if scale < 1.0:
+            faces = [self._scale_rect(face, 1.0 / scale) for face in faces]
+        self._last_faces = faces
+        self._frames_since_detection = 1
+        return faces
+
+    def scale_floor(self):
+        """Menor escala de busca em que o menor rosto esperado ainda cabe na janela do HOG.
+
+        O menor rosto esperado é o menor dos últimos rostos encontrados ou, sem
+        rastreamento, 'min_face_fraction' do lado menor do frame.
+        """
+        if self._last_faces:
+            smallest = min(min(face.width(), face.height()) for face in self._last_faces)
+        elif self._frame_size is not None:
+            smallest = self.min_face_fraction * min(self._frame_size)
+        else:
+            return 1.0
+        return min(1.0, HOG_FACE_MARGIN * HOG_MIN_FACE_SIZE / max(smallest, 1))
+
+    def share(self):
+        """Nova instância com o mesmo ajuste de rastreamento, mas estado de rastreamento próprio.
+
+        Só o preditor de landmarks é compartilhado: o detector HOG é sempre o
+        da thread que chama 'analyze', então cópias podem rodar em paralelo.
+        """
+        clone = copy.copy(self)
+        clone.reset_tracking()
+        return clone
+
+    def reset_tracking(self):
+        """Descarta o estado de rastreamento, forçando uma detecção completa."""
+        self._last_faces = []
+        self._frames_since_detection = 0
+
+    @staticmethod
+    def _scale_rect(rect, factor):
+        """Retângulo dlib com as coordenadas multiplicadas por 'factor'."""
+        import dlib # já carregado pelo registro de modelos
+
+        return dlib.rectangle(int(round(rect.left() * factor)), int(round(rect.top() * factor)),
+                              int(round(rect.right() * factor)), int(round(rect.bottom() * factor)))
+
+    def _search_rois(self, gray, scale=1.0):
+        """Procura cada rosto rastreado numa ROI ampliada; retorna [] se algum se perder.
+
+        'gray' pode estar reduzido por 'scale'; os rostos retornados ficam
+        sempre em coordenadas do frame original.
+        """
+        import dlib # já carregado pelo registro de modelos
+
+        height, width = gray.shape[:2]
+        faces = []
+        for face in self._last_faces:
+            if scale < 1.0:
+                face = self._scale_rect(face, scale)
+            pad_x = int(face.width() * self.roi_padding)
+            pad_y = int(face.height() * self.roi_padding)
+            left = max(0, face.left() - pad_x)
+            top = max(0, face.top() - pad_y)
+            right = min(width, face.right() + pad_x)
+            bottom = min(height, face.bottom() + pad_y)
+            if right <= left or bottom <= top:
+                return []
+
+            roi = np.ascontiguousarray(gray[top:bottom, left:right])
+            candidates = self.detector(roi)
+            if len(candidates) == 0:
+                return []
+
+            # Mantém o candidato de maior área e converte para coordenadas do frame
+            best = max(candidates, key=lambda rect: rect.area())
+            found = dlib.rectangle(best.left() + left, best.top() + top,
+                                   best.right() + left, best.bottom() + top)
+            faces.append(self._scale_rect(found, 1.0 / scale) if scale < 1.0 else found)
+        return faces
+
     # obtém os landmarks do rosto
-    def get_landmarks(self, frame, face):
-      gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    def get_landmarks(self, frame, face, gray=None):
+      if gray is None:
+          gray = self.to_gray(frame)
       landmarks = self.predictor(gray, face)
       return landmarks
     
+    # analisa um frame completo: detecção, landmarks e métricas
+    def analyze(self, frame):
+      """Retorna um FaceMeasurement por rosto, convertendo o frame para cinza uma única vez."""
+      timed = telemetry.enabled # sem telemetria nem o relógio é consultado
+      start = time.perf_counter() if timed else 0.0
+      gray = self.to_gray(frame)
+      faces = self.track_faces(frame, gray)
+      if timed:
+          detected = time.perf_counter()
+          _DETECTION_LATENCY.observe(detected - start)
+      measurements = []
+      for face in faces:
+          points = self.landmarks_to_np(self.get_landmarks(frame, face, gray))
+          ear, mar = self.calculate_metrics(points)
+          measurements.append(FaceMeasurement(face, points, ear, mar))
+      if timed and measurements:
+          _LANDMARKS_LATENCY.observe(time.perf_counter() - detected)
+      return measurements
+
+    # converte os landmarks para um array NumPy (68, 2)
+    def landmarks_to_np(self, landmarks):
+      """Converte o shape do dlib em array (68, 2) int32; arrays são retornados como estão."""
+      if isinstance(landmarks, np.ndarray):
+          return landmarks
+      return shape_to_np(landmarks)
+
+    # EAR médio e MAR de um rosto a partir do array (68, 2)
+    def calculate_metrics(self, points):
+      """Retorna (EAR médio dos dois olhos, MAR) calculados de forma vetorizada."""
+      avg_ear = float(eye_aspect_ratios(points).mean())
+      mar = float(mouth_aspect_ratio(points))
+      return avg_ear, mar
+
     # calculo do EAR (Eye Aspect Ratio)
     def calculate_ear(self, landmarks, eye_points):
-      """Calcula o Eye Aspect Ratio (EAR) para os pontos dos olhos."""
+      """Calcula o Eye Aspect Ratio (EAR) para os pontos dos olhos.
+
+      Para os dois olhos de uma vez use landmarks.eye_aspect_ratios.
+      """
+      eye_region = self.landmarks_to_np(landmarks)[eye_points]
 
-      # Obtém as coordenadas dos pontos dos olhos
-      eye_region = [(landmarks.part(n).x, landmarks.part(n).y) for n in eye_points]
-      
       # calcula a distancia vertical e horizontal
-      A = distance.euclidean(eye_region[1], eye_region[5])  
-      B = distance.euclidean(eye_region[2], eye_region[4])  
-      C = distance.euclidean(eye_region[0], eye_region[3])
-      
+      A = np.linalg.norm(eye_region[1] - eye_region[5])
+      B = np.linalg.norm(eye_region[2] - eye_region[4])
+      C = np.linalg.norm(eye_region[0] - eye_region[3])
+
       EAR = (A + B) / (2.0 * C)
-      return EAR
-   
+      return float(EAR)
+
     #calculo do MAR (Mouth Aspect Ratio)
     def calculate_mar(self, landmarks, mouth_points):
       """calcula o mouth aspect ratio (MAR) para os pontos da boca. (detecta bocejos)"""
-      
+
       # obtem as coordenadas dos pontos da boca
-      mounth_region = [(landmarks.part(n).x, landmarks.part(n).y) for n in mouth_points]
-      
+      mounth_region = self.landmarks_to_np(landmarks)[mouth_points]
+
       # calculo da distancia vertical e horizontal
-      A = distance.euclidean(mounth_region[2], mounth_region[10])  # Distância vertical
-      B = distance.euclidean(mounth_region[4], mounth_region[8])  # Distância vertical interna
-      C = distance.euclidean(mounth_region[0], mounth_region[6]) # distancia horizontal
-      
+      A = np.linalg.norm(mounth_region[2] - mounth_region[10])  # Distância vertical
+      B = np.linalg.norm(mounth_region[4] - mounth_region[8])  # Distância vertical interna
+      C = np.linalg.norm(mounth_region[0] - mounth_region[6]) # distancia horizontal
+
       MAR = (A + B) / (2.0 * C)
-      return MAR
\ No newline at end of file
+      return float(MAR)
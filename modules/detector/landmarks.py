@@ -0,0 +1,57 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Índices dos 68 landmarks do dlib usados nas métricas
+LEFT_EYE_POINTS = np.arange(36, 42)   # Landmarks do olho esquerdo
+RIGHT_EYE_POINTS = np.arange(42, 48)  # Landmarks do olho direito
+MOUTH_POINTS = np.arange(48, 60)      # Landmarks da boca
+
+# Os dois olhos empilhados: (2, 6) -> esquerdo, direito
+EYES_POINTS = np.stack([LEFT_EYE_POINTS, RIGHT_EYE_POINTS])
+
+# Resultado da análise de um rosto: retângulo dlib, landmarks (68, 2), EAR médio e MAR.
+# Fica aqui, sem dependência de cv2/dlib, para quem só consome medidas (ex.: reprodução)
+FaceMeasurement = namedtuple("FaceMeasurement", ["face", "points", "ear", "mar"])
+
+
+def shape_to_np(shape, dtype=np.int32):
+    """Converte um dlib.full_object_detection em um array (68, 2) de coordenadas (x, y)."""
+    return np.array([(p.x, p.y) for p in shape.parts()], dtype=dtype)
+
+
+def _distance(a, b):
+    """Distância euclidiana ao longo do último eixo."""
+    return np.sqrt(np.sum(np.square(a - b, dtype=np.float64), axis=-1))
+
+
+def eye_aspect_ratios(points):
+    """Calcula o EAR dos dois olhos de uma vez.
+
+    Aceita um único rosto (68, 2) ou um lote (N, 68, 2) e retorna,
+    respectivamente, um array (2,) ou (N, 2) com [esquerdo, direito].
+    """
+    eyes = np.asarray(points)[..., EYES_POINTS, :]  # (..., 2, 6, 2)
+
+    # distancias verticais e horizontal
+    A = _distance(eyes[..., 1, :], eyes[..., 5, :])
+    B = _distance(eyes[..., 2, :], eyes[..., 4, :])
+    C = _distance(eyes[..., 0, :], eyes[..., 3, :])
+
+    return (A + B) / (2.0 * C)
+
+
+def average_ear(points):
+    """EAR médio entre os dois olhos: escalar para (68, 2), array (N,) para (N, 68, 2)."""
+    return eye_aspect_ratios(points).mean(axis=-1)
+
+
+def mouth_aspect_ratio(points):
+    """Calcula o MAR para um rosto (68, 2) ou para um lote (N, 68, 2)."""
+    mouth = np.asarray(points)[..., MOUTH_POINTS, :]  # (..., 12, 2)
+
+    A = _distance(mouth[..., 2, :], mouth[..., 10, :])  # Distância vertical
+    B = _distance(mouth[..., 4, :], mouth[..., 8, :])   # Distância vertical interna
+    C = _distance(mouth[..., 0, :], mouth[..., 6, :])   # distancia horizontal
+
+    return (A + B) / (2.0 * C)
@@ -0,0 +1,64 @@
+"""Registro de modelos: carregados sob demanda, no primeiro uso.
+
+O preditor de landmarks (~100 MB) é carregado uma única vez por processo e
+compartilhado por todas as instâncias de FaceDetector (e FaceUtils). O
+detector HOG não aceita chamadas concorrentes, então cada thread recebe o
+seu (criá-lo é barato). Chamar 'preload()' antes de criar processos com
+fork faz os workers herdarem o preditor já carregado (memória compartilhada
+por copy-on-write) em vez de carregar o modelo cada um.
+
+O dlib só é importado quando um modelo é pedido pela primeira vez.
+"""
+import os
+import threading
+
+# Modelo de landmarks (caminho relativo à raiz do projeto)
+SHAPE_PREDICTOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    "..", "..", "models", "shape_predictor_68_face_landmarks.dat")
+
+_models = {}
+_lock = threading.Lock()
+_thread_models = threading.local()
+
+
+def _get_or_load(key, loader):
+    model = _models.get(key)
+    if model is None:
+        with _lock:
+            # Outra thread pode ter carregado enquanto esperávamos o lock
+            model = _models.get(key)
+            if model is None:
+                model = loader()
+                _models[key] = model
+    return model
+
+
+def get_face_detector():
+    """Detector HOG de rostos frontais do dlib, um por thread (não é seguro entre threads)."""
+    detector = getattr(_thread_models, "face_detector", None)
+    if detector is None:
+        import dlib
+        detector = _thread_models.face_detector = dlib.get_frontal_face_detector()
+    return detector
+
+
+def get_shape_predictor(model_path=SHAPE_PREDICTOR_PATH):
+    """Preditor de 68 landmarks; levanta FileNotFoundError se o modelo não existir."""
+    model_path = os.path.normpath(model_path)
+
+    def load():
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Modelo de landmarks não encontrado em: {model_path}")
+        import dlib
+        return dlib.shape_predictor(model_path)
+    return _get_or_load(("shape_predictor", model_path), load)
+
+
+def preload(model_path=SHAPE_PREDICTOR_PATH):
+    """Carrega os modelos agora (ex.: no processo pai, antes do fork dos workers).
+
+    O detector HOG criado aqui é o da thread que chamou; as demais threads
+    criam o seu no primeiro uso.
+    """
+    get_face_detector()
+    get_shape_predictor(model_path)
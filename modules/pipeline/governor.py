@@ -0,0 +1,117 @@
+import math
+import threading
+
+from modules.telemetry.telemetry import telemetry
+
+
+class FrameGovernor:
+    """Ajusta o custo da inferência à folga de CPU medida.
+
+    A cada frame analisado mede a latência da inferência e estima a carga
+    como latência * target_fps / stride. Acima de 'high_load' primeiro reduz
+    a escala da busca de rostos (até 'min_scale', ou até onde o FaceDetector
+    ainda detecta o menor rosto esperado; os landmarks continuam na
+    resolução original) e depois passa a analisar só um a cada 'stride'
+    frames; com folga desfaz os ajustes na ordem inversa.
+
+    Enquanto 'urgent' estiver ligado (olhos fechados ou alerta pendente)
+    todos os frames são analisados, para não atrasar o alerta.
+    """
+
+    def __init__(self, target_fps=20.0, face_detector=None, max_stride=4, min_scale=0.5,
+                 scale_step=0.25, high_load=0.9, low_load=0.6, adjust_every=10, alpha=0.2,
+                 stream="main"):
+        self.target_fps = target_fps
+        self.face_detector = face_detector
+        self.max_stride = max_stride
+        # Sem FaceDetector não há escala a ajustar, só o stride
+        self.min_scale = min_scale if face_detector is not None else 1.0
+        self.scale_step = scale_step
+        self.high_load = high_load
+        self.low_load = low_load
+        self.adjust_every = adjust_every
+        self.alpha = alpha
+        self.stride = 1
+        self.scale = face_detector.detection_scale if face_detector is not None else 1.0
+        self.urgent = False
+        self.latency = None # média móvel da latência da inferência (s)
+        self.skipped = 0
+        self._since_analysis = 0
+        self._since_adjust = 0
+        self._lock = threading.Lock()
+        telemetry.gauge("governor_stride", "Analisa um a cada N frames", fn=lambda: self.stride, stream=stream)
+        telemetry.gauge("governor_detection_scale", "Escala do frame na busca de rostos",
+                        fn=lambda: self.scale, stream=stream)
+        telemetry.counter("governor_frames_skipped_total", "Frames não analisados pelo governador",
+                          fn=lambda: self.skipped, stream=stream)
+
+    def should_process(self):
+        """Decide se o próximo frame passa pela inferência."""
+        with self._lock:
+            self._since_analysis += 1
+            if self.urgent or self._since_analysis >= self.stride:
+                self._since_analysis = 0
+                return True
+            self.skipped += 1
+            return False
+
+    def set_urgent(self, urgent):
+        """Liga/desliga a análise de todos os frames (chamado por quem avalia os alertas)."""
+        self.urgent = urgent
+
+    def load(self, stride=None):
+        """Fração do orçamento de tempo por frame gasta na inferência com o 'stride' dado."""
+        if self.latency is None:
+            return 0.0
+        return self.latency * self.target_fps / (stride or self.stride)
+
+    def record(self, elapsed):
+        """Registra a latência de um frame analisado e, periodicamente, reajusta escala e stride."""
+        with self._lock:
+            if self.latency is None:
+                self.latency = elapsed
+            else:
+                self.latency += self.alpha * (elapsed - self.latency)
+            self._since_adjust += 1
+            if self._since_adjust < self.adjust_every:
+                return
+            self._since_adjust = 0
+            self._adjust()
+
+    def scale_floor(self):
+        """Menor escala permitida agora: 'min_scale' ou o piso do FaceDetector, o maior."""
+        if self.face_detector is None:
+            return self.min_scale
+        return max(self.min_scale, self.face_detector.scale_floor())
+
+    def _adjust(self):
+        if self.load() > self.high_load:
+            floor = self.scale_floor()
+            if self.scale > floor:
+                self._set_scale(max(floor, self.scale - self.scale_step))
+            else:
+                self.stride = min(self.max_stride, max(self.stride + 1, math.ceil(self.load(1))))
+        elif self.stride > 1:
+            if self.load(self.stride - 1) < self.low_load:
+                self.stride -= 1
+        elif self.scale < 1.0:
+            # O custo da busca cresce com a área: estima a carga na escala seguinte
+            next_scale = min(1.0, self.scale + self.scale_step)
+            if self.load(1) * (next_scale / self.scale) ** 2 < self.low_load:
+                self._set_scale(next_scale)
+
+    def _set_scale(self, scale):
+        self.scale = scale
+        if self.face_detector is not None:
+            self.face_detector.detection_scale = scale
+            # Latências medidas na escala anterior não valem mais
+            self.latency = None
+
+    def snapshot(self):
+        return {
+            "stride": self.stride,
+            "detection_scale": self.scale,
+            "urgent": self.urgent,
+            "load": self.load(),
+            "skipped": self.skipped,
+        }
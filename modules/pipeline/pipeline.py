@@ -0,0 +1,271 @@
+import threading
+import time
+from collections import deque
+
+from modules.telemetry.telemetry import telemetry
+
+
+class FrameQueue:
+    """Fila limitada que descarta o item mais antigo quando está cheia.
+
+    Para detecção em tempo real o frame mais recente vale mais do que um
+    frame atrasado, então o produtor nunca bloqueia.
+    """
+
+    def __init__(self, maxsize=2):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Retorna o próximo item, ou None se a fila foi fechada ou o timeout expirou."""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def __len__(self):
+        return len(self._items)
+
+
+def register_queue_metrics(stream, queue_name, frame_queue):
+    """Publica a profundidade e os descartes de uma FrameQueue (lidos só na coleta)."""
+    telemetry.gauge("queue_depth", "Itens aguardando na fila", fn=frame_queue.__len__,
+                    stream=stream, queue=queue_name)
+    telemetry.counter("frames_dropped_total", "Frames descartados por fila cheia",
+                      fn=lambda: frame_queue.dropped, stream=stream, queue=queue_name)
+
+
+class StageStats:
+    """Contadores de latência de um estágio do pipeline (seguro entre threads).
+
+    Cada registro também alimenta o histograma stage_latency_seconds da
+    telemetria, rotulado pelo estágio e pelo fluxo (câmera) a que pertence.
+    """
+
+    def __init__(self, name, stream="main"):
+        self.name = name
+        self.histogram = telemetry.histogram("stage_latency_seconds", "Latência por estágio do pipeline",
+                                             stream=stream, stage=name)
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed):
+        with self._lock:
+            self.count += 1
+            self.total_time += elapsed
+            self.last_time = elapsed
+            if elapsed > self.max_time:
+                self.max_time = elapsed
+        self.histogram.observe(elapsed)
+
+    def snapshot(self):
+        with self._lock:
+            avg = self.total_time / self.count if self.count else 0.0
+            return {
+                "count": self.count,
+                "avg_ms": avg * 1000.0,
+                "last_ms": self.last_time * 1000.0,
+                "max_ms": self.max_time * 1000.0,
+            }
+
+
+class FramePacket:
+    """Frame capturado e, após a inferência, o resultado da análise.
+
+    'analyzed' é False quando o governador pulou o frame; 'result' traz então
+    o último resultado disponível, útil só para desenhar.
+    """
+    __slots__ = ("index", "timestamp", "frame", "result", "analyzed")
+
+    def __init__(self, index, timestamp, frame):
+        self.index = index
+        self.timestamp = timestamp
+        self.frame = frame
+        self.result = None
+        self.analyzed = False
+
+
+class CaptureStage(threading.Thread):
+    """Lê frames da câmera e os publica numa FrameQueue (descartando os mais antigos)."""
+
+    def __init__(self, cap, output_queue, stream="main"):
+        super().__init__(name=f"capture-{stream}", daemon=True)
+        self.cap = cap
+        self.output_queue = output_queue
+        self.stats = StageStats("capture", stream)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        index = 0
+        while not self._stop_event.is_set():
+            start = time.perf_counter()
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            self.stats.record(time.perf_counter() - start)
+            self.output_queue.put(FramePacket(index, time.time(), frame))
+            index += 1
+        self.output_queue.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class InferenceStage:
+    """Pool de threads que aplica 'process_fn' a cada frame capturado.
+
+    Com mais de um worker 'process_fn' precisa ser seguro entre threads e os
+    resultados podem sair fora de ordem (o estágio de renderização descarta
+    os atrasados). Com um FrameGovernor só os frames que ele libera são
+    analisados.
+    """
+
+    def __init__(self, process_fn, input_queue, output_queue, workers=1, stream="main", governor=None):
+        self.process_fn = process_fn
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.governor = governor
+        self._last_result = []
+        self.stats = StageStats("inference", stream)
+        self._threads = [
+            threading.Thread(target=self._run, name=f"inference-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        self._stop_event = threading.Event()
+        self._active = workers
+        self._lock = threading.Lock()
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            packet = self.input_queue.get(timeout=0.1)
+            if packet is None:
+                if self.input_queue.closed:
+                    break
+                continue
+            if self.governor is not None and not self.governor.should_process():
+                packet.result = self._last_result
+                self.output_queue.put(packet)
+                continue
+            start = time.perf_counter()
+            packet.result = self._last_result = self.process_fn(packet.frame)
+            packet.analyzed = True
+            elapsed = time.perf_counter() - start
+            self.stats.record(elapsed)
+            if self.governor is not None:
+                self.governor.record(elapsed)
+            self.output_queue.put(packet)
+
+        # O último worker a sair fecha a fila de saída
+        with self._lock:
+            self._active -= 1
+            if self._active == 0:
+                self.output_queue.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+
+class Pipeline:
+    """Pipeline captura -> inferência -> renderização.
+
+    A captura e a inferência rodam em threads próprias; a renderização e os
+    alertas ficam com quem consome 'results()' (em geral a thread principal,
+    exigência do cv2.imshow).
+
+    'stream' identifica a câmera nas métricas publicadas em /metrics;
+    'governor' (FrameGovernor) reduz a inferência quando falta CPU.
+    """
+
+    def __init__(self, cap, process_fn, workers=1, queue_size=2, stream="main", governor=None):
+        self.frame_queue = FrameQueue(queue_size)
+        self.result_queue = FrameQueue(queue_size)
+        self.governor = governor
+        self.capture = CaptureStage(cap, self.frame_queue, stream)
+        self.inference = InferenceStage(process_fn, self.frame_queue, self.result_queue, workers, stream,
+                                        governor)
+        self.render_stats = StageStats("render", stream)
+        self.latency_stats = StageStats("end_to_end", stream)
+        self.fps = telemetry.fps_meter(stream=stream)
+        self.frames_rendered = telemetry.counter("frames_total", "Frames processados até a renderização",
+                                                 stream=stream)
+        register_queue_metrics(stream, "frames", self.frame_queue)
+        register_queue_metrics(stream, "results", self.result_queue)
+        self._last_index = -1
+
+    def start(self):
+        self.capture.start()
+        self.inference.start()
+
+    def results(self, timeout=0.1):
+        """Gera os frames processados em ordem, descartando resultados atrasados."""
+        while True:
+            packet = self.result_queue.get(timeout)
+            if packet is None:
+                if self.result_queue.closed:
+                    return
+                continue
+            if packet.index <= self._last_index:
+                continue
+            self._last_index = packet.index
+            yield packet
+
+    def record_render(self, packet, render_start):
+        """Registra o tempo de renderização e a latência captura -> alerta do frame."""
+        self.render_stats.record(time.perf_counter() - render_start)
+        self.latency_stats.record(time.time() - packet.timestamp)
+        self.frames_rendered.inc()
+        self.fps.tick()
+
+    def stats(self):
+        """Latência por estágio e profundidade das filas."""
+        return {
+            "capture": self.capture.stats.snapshot(),
+            "inference": self.inference.stats.snapshot(),
+            "render": self.render_stats.snapshot(),
+            "end_to_end": self.latency_stats.snapshot(),
+            "fps": self.fps.fps,
+            "frame_queue_depth": len(self.frame_queue),
+            "result_queue_depth": len(self.result_queue),
+            "frames_dropped": self.frame_queue.dropped,
+            "results_dropped": self.result_queue.dropped,
+            "governor": self.governor.snapshot() if self.governor is not None else None,
+        }
+
+    def stop(self):
+        self.capture.stop()
+        self.inference.stop()
+        self.capture.join(1.0)
+        self.inference.join(1.0)
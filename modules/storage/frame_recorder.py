@@ -0,0 +1,150 @@
+"""Gravação binária compacta das medidas de cada frame (uma linha por rosto).
+
+Registros de largura fixa (FRAME_RECORD_DTYPE) são acrescentados a arquivos
+'chunk_NNNNN.bin' dentro do diretório da gravação, junto de um 'meta.json'
+com o dtype e os limiares usados. Os blocos são lidos por np.memmap, sem
+cópia nem parsing, e servem para reanalisar sessões com outros limiares
+(modules.analyzer.replay) e para a calibração offline.
+"""
+import datetime
+import glob
+import json
+import os
+import time
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+RECORDINGS_DIR = os.path.join("reports", "recordings")
+RECORDING_VERSION = 1
+
+# track_id -1 marca um frame sem rostos (mantém o relógio da reprodução)
+FRAME_RECORD_DTYPE = np.dtype([
+    ("frame_index", "<i8"),
+    ("timestamp", "<f8"),
+    ("track_id", "<i4"),
+    ("left", "<i4"),
+    ("top", "<i4"),
+    ("right", "<i4"),
+    ("bottom", "<i4"),
+    ("ear", "<f4"),
+    ("mar", "<f4"),
+])
+
+
+def _write_json(path: str, data: dict):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as file:
+        json.dump(data, file, indent=2)
+    os.replace(temp_path, path)
+
+
+class FrameRecorder:
+    """Grava append-only as medidas por frame em blocos binários.
+
+    Os registros ficam num buffer NumPy e vão para o disco a cada
+    'buffer_records' linhas ou a cada 'flush_interval' segundos, o que vier
+    antes (uma única escrita sequencial; uma queda do processo perde no
+    máximo esse intervalo); um novo bloco é iniciado a cada 'chunk_records'
+    linhas.
+    """
+
+    def __init__(self, directory: str, session_id: Optional[str] = None, chunk_records: int = 1 << 20,
+                 buffer_records: int = 4096, flush_interval: float = 2.0, **meta):
+        self.directory = directory
+        self.chunk_records = chunk_records
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        self._buffer = np.zeros(buffer_records, dtype=FRAME_RECORD_DTYPE)
+        self._buffered = 0
+        self._chunk_index = len(glob.glob(os.path.join(directory, "chunk_*.bin")))
+        self._chunk_written = 0
+        self._file = None
+        self.meta = {
+            "version": RECORDING_VERSION,
+            "session_id": session_id,
+            "dtype": FRAME_RECORD_DTYPE.descr,
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            **meta,
+        }
+        _write_json(os.path.join(directory, "meta.json"), self.meta)
+
+    def record_frame(self, frame_index: int, timestamp: float, measurements, track_ids=None):
+        """Registra os rostos de um frame (FaceMeasurement); sem rostos grava uma linha com track_id -1."""
+        if not measurements:
+            self._append(frame_index, timestamp, -1, 0, 0, 0, 0, np.nan, np.nan)
+        for i, measurement in enumerate(measurements):
+            face = measurement.face
+            track_id = track_ids[i] if track_ids is not None else 0
+            self._append(frame_index, timestamp, track_id, face.left(), face.top(), face.right(), face.bottom(),
+                         measurement.ear, measurement.mar)
+        if self._buffered and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _append(self, *values):
+        self._buffer[self._buffered] = values
+        self._buffered += 1
+        if self._buffered == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        """Grava o buffer no bloco atual, abrindo o próximo quando ele enche."""
+        start = 0
+        while start < self._buffered:
+            if self._file is None:
+                path = os.path.join(self.directory, f"chunk_{self._chunk_index:05d}.bin")
+                self._file = open(path, "ab")
+                self._chunk_written = 0
+            count = min(self._buffered - start, self.chunk_records - self._chunk_written)
+            self._buffer[start:start + count].tofile(self._file)
+            self._chunk_written += count
+            start += count
+            if self._chunk_written >= self.chunk_records:
+                self._file.close()
+                self._file = None
+                self._chunk_index += 1
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class FrameRecording:
+    """Leitura de uma gravação: cada bloco é um np.memmap somente leitura."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as file:
+            self.meta = json.load(file)
+        if self.meta.get("version") != RECORDING_VERSION:
+            raise ValueError(f"{directory}: versão de gravação {self.meta.get('version')} não suportada")
+        self.dtype = np.dtype([tuple(field) for field in self.meta["dtype"]])
+        self.chunk_paths = sorted(glob.glob(os.path.join(directory, "chunk_*.bin")))
+
+    @staticmethod
+    def is_recording(path: str) -> bool:
+        return os.path.isdir(path) and os.path.exists(os.path.join(path, "meta.json"))
+
+    def chunks(self) -> Iterator[np.ndarray]:
+        """Gera os blocos mapeados em memória (um registro incompleto no fim é ignorado)."""
+        for path in self.chunk_paths:
+            count = os.path.getsize(path) // self.dtype.itemsize
+            if count:
+                yield np.memmap(path, dtype=self.dtype, mode="r", shape=(count,))
+
+    def records(self) -> np.ndarray:
+        """Todos os registros num único array (copia; para gravações muito longas use 'chunks')."""
+        chunks: List[np.ndarray] = list(self.chunks())
+        if not chunks:
+            return np.zeros(0, dtype=self.dtype)
+        return np.concatenate(chunks)
+
+    def __len__(self):
+        return sum(os.path.getsize(path) // self.dtype.itemsize for path in self.chunk_paths)
@@ -0,0 +1,228 @@
+"""Armazenamento indexado de eventos por sessão (SQLite em modo WAL).
+
+O EventLogger grava aqui e as rotas do dashboard consultam direto, então o
+custo de uma consulta depende do tamanho da sessão e não do histórico todo.
+As amostras de métricas contínuas (PERCLOS, piscadas) ficam numa tabela
+própria, fora da tabela de eventos.
+
+Importação única dos CSVs antigos:
+    python -m modules.storage.session_store reports/*.csv
+"""
+import csv
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Iterable, List, Optional, Sequence
+
+# Banco único com os eventos de todas as sessões
+SESSIONS_DB_PATH = os.path.join("reports", "sessions.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    event_type TEXT NOT NULL,
+    metric_value REAL
+);
+-- Não é único: dois rostos no mesmo frame podem gerar o mesmo evento com o mesmo timestamp
+CREATE INDEX IF NOT EXISTS idx_events_session_timestamp
+    ON events (session_id, timestamp);
+CREATE TABLE IF NOT EXISTS metrics (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    name TEXT NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS idx_metrics_session_timestamp
+    ON metrics (session_id, timestamp);
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    first_event_id INTEGER NOT NULL
+);
+-- Sessões encerradas: seus eventos não mudam mais
+CREATE TABLE IF NOT EXISTS closed_sessions (
+    session_id TEXT PRIMARY KEY,
+    closed_at REAL NOT NULL
+);
+-- Linhas de cada CSV já importadas: reimportar só acrescenta as novas
+CREATE TABLE IF NOT EXISTS csv_imports (
+    path TEXT PRIMARY KEY,
+    rows INTEGER NOT NULL
+);
+"""
+
+
+class SessionStore:
+    """Acesso ao banco de sessões; cada thread usa sua própria conexão."""
+
+    def __init__(self, path: str = SESSIONS_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._connection() # cria o esquema já na construção
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.row_factory = sqlite3.Row
+            # WAL: leitores do dashboard não bloqueiam o EventLogger (e vice-versa)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def insert_events(self, rows: Iterable[Sequence]) -> List[int]:
+        """Insere linhas (session_id, timestamp, event_type, metric_value); retorna os ids, na mesma ordem."""
+        conn = self._connection()
+        ids = []
+        with conn:
+            for session_id, timestamp, event_type, metric_value in rows:
+                cursor = conn.execute(
+                    "INSERT INTO events (session_id, timestamp, event_type, metric_value) VALUES (?, ?, ?, ?)",
+                    (session_id, float(timestamp), event_type,
+                     None if metric_value in (None, "") else float(metric_value)),
+                )
+                ids.append(cursor.lastrowid)
+                conn.execute("INSERT OR IGNORE INTO sessions VALUES (?, ?)", (session_id, cursor.lastrowid))
+        return ids
+
+    def insert_metrics(self, rows: Iterable[Sequence]) -> int:
+        """Insere amostras de métricas (session_id, timestamp, name, value)."""
+        conn = self._connection()
+        with conn:
+            cursor = conn.executemany(
+                "INSERT INTO metrics (session_id, timestamp, name, value) VALUES (?, ?, ?, ?)",
+                ((session_id, float(timestamp), name, None if value in (None, "") else float(value))
+                 for session_id, timestamp, name, value in rows),
+            )
+        return cursor.rowcount
+
+    def list_sessions(self) -> List[str]:
+        """Sessões na ordem em que apareceram (a última é a mais recente)."""
+        rows = self._connection().execute(
+            "SELECT session_id FROM sessions ORDER BY first_event_id").fetchall()
+        return [row["session_id"] for row in rows]
+
+    def latest_session_id(self) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT session_id FROM sessions ORDER BY first_event_id DESC LIMIT 1").fetchone()
+        return row["session_id"] if row else None
+
+    def close_session(self, session_id: str):
+        """Marca a sessão como encerrada (chamado depois do último evento gravado)."""
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO closed_sessions VALUES (?, ?)", (session_id, time.time()))
+
+    def is_session_closed(self, session_id: str) -> bool:
+        return self._connection().execute(
+            "SELECT 1 FROM closed_sessions WHERE session_id = ?", (session_id,)).fetchone() is not None
+
+    def get_events(self, session_id: str, since: Optional[float] = None,
+                   after_id: Optional[int] = None) -> List[dict]:
+        """Eventos de uma sessão em ordem cronológica (usa o índice (session_id, timestamp)).
+
+        'since' retorna apenas eventos com timestamp posterior; 'after_id' apenas
+        linhas com id maior que o cursor. Para buscas incrementais prefira
+        'after_id': eventos com o mesmo timestamp não se perdem.
+        """
+        query = ("SELECT id, session_id, timestamp, event_type, metric_value FROM events "
+                 "WHERE session_id = ?")
+        params = [session_id]
+        if since is not None:
+            query += " AND timestamp > ?"
+            params.append(since)
+        if after_id is not None:
+            query += " AND id > ?"
+            params.append(after_id)
+        rows = self._connection().execute(query + " ORDER BY timestamp, id", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_metrics(self, session_id: str) -> List[dict]:
+        """Amostras de métricas contínuas de uma sessão em ordem cronológica."""
+        rows = self._connection().execute(
+            "SELECT session_id, timestamp, name, value FROM metrics WHERE session_id = ? ORDER BY timestamp",
+            (session_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def import_csv(self, csv_path: str, batch_size: int = 5000) -> int:
+        """Importa um CSV de eventos; retorna quantas linhas eram novas.
+
+        Aceita o formato de all_sessions_data.csv e os antigos session_data_<id>.csv,
+        que não têm a coluna session_id (o id vem do nome do arquivo).
+
+        Os CSVs são append-only: o banco guarda quantas linhas de cada arquivo já
+        foram importadas e só as seguintes entram. Linhas de sessões que já
+        estavam no banco antes da importação (gravadas ao vivo pelo EventLogger,
+        que escreve no banco e no CSV) também são puladas. As sessões
+        importadas são marcadas como encerradas.
+        """
+        file_name = os.path.splitext(os.path.basename(csv_path))[0]
+        default_session_id = file_name[len("session_data_"):] if file_name.startswith("session_data_") else file_name
+        import_key = os.path.abspath(csv_path)
+
+        conn = self._connection()
+        row = conn.execute("SELECT rows FROM csv_imports WHERE path = ?", (import_key,)).fetchone()
+        already_imported = row["rows"] if row else 0
+        known_sessions = set(self.list_sessions())
+
+        inserted = 0
+        rows_read = 0
+        imported_sessions = set()
+        with open(csv_path, mode='r', newline='') as file:
+            reader = csv.DictReader(file)
+            batch = []
+            for record in reader:
+                rows_read += 1
+                if rows_read <= already_imported:
+                    continue
+                session_id = record.get('session_id') or default_session_id
+                if session_id in known_sessions:
+                    continue
+                imported_sessions.add(session_id)
+                batch.append((session_id, record['timestamp'], record['event_type'], record.get('metric_value')))
+                if len(batch) >= batch_size:
+                    inserted += len(self.insert_events(batch))
+                    batch = []
+            if batch:
+                inserted += len(self.insert_events(batch))
+
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO csv_imports VALUES (?, ?)",
+                         (import_key, max(rows_read, already_imported)))
+        for session_id in imported_sessions:
+            self.close_session(session_id)
+        return inserted
+
+    def close(self):
+        """Fecha a conexão da thread atual."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def main(argv):
+    if not argv:
+        print("Uso: python -m modules.storage.session_store <arquivo.csv> [...]")
+        return 1
+    store = SessionStore()
+    for csv_path in argv:
+        try:
+            print(f"{csv_path}: {store.import_csv(csv_path)} eventos importados")
+        except (KeyError, ValueError) as e:
+            print(f"{csv_path}: ignorado, formato inesperado ({e})")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,19 @@
+import cv2
+
+
+def draw_stats_overlay(frame, stats, origin=(10, 200)):
+    """Desenha no frame FPS, latências por estágio e descartes vindos de Pipeline.stats()."""
+    lines = [f"FPS: {stats['fps']:.1f}"]
+    for stage in ("capture", "inference", "render", "end_to_end"):
+        lines.append(f"{stage}: {stats[stage]['last_ms']:.1f} ms (max {stats[stage]['max_ms']:.1f})")
+    lines.append(f"Filas: {stats['frame_queue_depth']}/{stats['result_queue_depth']}"
+                 f" - descartados: {stats['frames_dropped']}/{stats['results_dropped']}")
+    governor = stats.get("governor")
+    if governor:
+        lines.append(f"Stride: {governor['stride']} - escala: {governor['detection_scale']:.2f}"
+                     f" - carga: {governor['load']:.2f}")
+
+    x, y = origin
+    for line in lines:
+        cv2.putText(frame, line, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 0), 1)
+        y += 18
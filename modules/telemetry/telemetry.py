@@ -0,0 +1,179 @@
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# Limites (em segundos) dos histogramas de latência: de 1 ms a 2,5 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, telemetry: "Telemetry", labels: Tuple[Tuple[str, str], ...]):
+        self._telemetry = telemetry
+        self.labels = labels
+        self._lock = threading.Lock()
+
+
+class Counter(_Metric):
+    """Contador monotônico. Com 'fn' o valor é lido na hora da coleta (ex.: FrameQueue.dropped)."""
+    kind = "counter"
+
+    def __init__(self, telemetry, labels, fn: Optional[Callable[[], float]] = None):
+        super().__init__(telemetry, labels)
+        self.value = 0.0
+        self.fn = fn
+
+    def inc(self, amount: float = 1.0):
+        if not self._telemetry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name):
+        value = self.fn() if self.fn is not None else self.value
+        yield name, self.labels, "", value
+
+
+class Gauge(Counter):
+    """Valor instantâneo (profundidade de fila, FPS). Também aceita 'fn' lida na coleta."""
+    kind = "gauge"
+
+    def set(self, value: float):
+        if self._telemetry.enabled:
+            self.value = value
+
+
+class Histogram(_Metric):
+    """Histograma de latências com limites fixos; 'observe' custa uma busca binária."""
+    kind = "histogram"
+
+    def __init__(self, telemetry, labels, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(telemetry, labels)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # o último é o +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        if not self._telemetry.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, name):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            yield name + "_bucket", self.labels, f'le="{_format_value(bound)}"', cumulative
+        yield name + "_sum", self.labels, "", total
+        yield name + "_count", self.labels, "", count
+
+
+class FpsMeter:
+    """Taxa de frames suavizada por média móvel exponencial, exportada como gauge."""
+
+    def __init__(self, gauge: Gauge, alpha: float = 0.1):
+        self.gauge = gauge
+        self.alpha = alpha
+        self.fps = 0.0
+        self._last = None
+
+    def tick(self, now: Optional[float] = None):
+        now = time.perf_counter() if now is None else now
+        if self._last is not None and now > self._last:
+            instant = 1.0 / (now - self._last)
+            self.fps = instant if self.fps == 0.0 else self.fps + self.alpha * (instant - self.fps)
+            self.gauge.set(self.fps)
+        self._last = now
+
+
+class Telemetry:
+    """Registro de contadores, medidores e histogramas do caminho crítico.
+
+    As métricas são criadas uma vez (fora do loop) e identificadas por nome e
+    rótulos, ex.: stream="cam0" para saber qual cabine está atrasada. Com
+    'enabled' False cada registro vira um retorno imediato; 'render' gera o
+    formato texto do Prometheus servido em /metrics pelo dashboard.
+    """
+
+    def __init__(self, namespace: str = "drowsiness", enabled: bool = True):
+        self.namespace = namespace
+        self.enabled = enabled
+        self._families: Dict[str, Tuple[str, str]] = {} # nome -> (tipo, descrição)
+        self._metrics: Dict[Tuple[str, tuple], _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help_text: str, labels: dict, **kwargs):
+        name = f"{self.namespace}_{name}"
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                self._families.setdefault(name, (cls.kind, help_text))
+                metric = self._metrics[key] = cls(self, key[1], **kwargs)
+            elif kwargs.get("fn") is not None:
+                metric.fn = kwargs["fn"] # nova instância da mesma fonte (ex.: pipeline recriado)
+            return metric
+
+    def counter(self, name: str, help_text: str, fn: Optional[Callable[[], float]] = None, **labels) -> Counter:
+        return self._get(Counter, name, help_text, labels, fn=fn)
+
+    def gauge(self, name: str, help_text: str, fn: Optional[Callable[[], float]] = None, **labels) -> Gauge:
+        return self._get(Gauge, name, help_text, labels, fn=fn)
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS,
+                  **labels) -> Histogram:
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def fps_meter(self, **labels) -> FpsMeter:
+        return FpsMeter(self.gauge("fps", "Frames por segundo processados (média móvel)", **labels))
+
+    def render(self) -> str:
+        """Todas as métricas no formato texto de exposição do Prometheus."""
+        with self._lock:
+            metrics = sorted(self._metrics.items(), key=lambda item: item[0])
+            families = dict(self._families)
+
+        lines = []
+        current = None
+        for (name, _), metric in metrics:
+            if name != current:
+                kind, help_text = families[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                current = name
+            try:
+                for sample_name, labels, extra, value in metric.samples(name):
+                    lines.append(f"{sample_name}{_format_labels(labels, extra)} {_format_value(value)}")
+            except Exception as e:
+                # Uma fonte com erro (ex.: fila já descartada) não derruba a coleta inteira
+                lines.append(f"# erro ao coletar {name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+# Instância compartilhada pelo processo (pipeline, detector, EventLogger, dashboard)
+telemetry = Telemetry()
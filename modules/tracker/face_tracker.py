@@ -0,0 +1,134 @@
+from collections import deque
+from typing import List, Optional, Sequence, Tuple
+
+Box = Tuple[int, int, int, int] # (left, top, right, bottom)
+
+
+class FaceTrack:
+    """Estado temporal de um rosto rastreado (compacto: __slots__ em vez de __dict__)."""
+    __slots__ = ("track_id", "box", "first_seen", "last_seen",
+                 "eye_closed_start_time", "mouth_open_start_time",
+                 "events", "metrics")
+
+    def __init__(self, track_id: int, box: Box, timestamp: float):
+        self.track_id = track_id
+        self.box = box
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.eye_closed_start_time: Optional[float] = None
+        self.mouth_open_start_time: Optional[float] = None
+        self.events = deque() # timestamps dos eventos deste rosto dentro da janela de risco
+        self.metrics = None # StreamingMetrics do rosto, criado por quem consome a trilha
+
+    def recent_events(self, timestamp: float, window: float) -> int:
+        """Eventos deste rosto nos últimos 'window' segundos (poda amortizada O(1))."""
+        return count_recent(self.events, timestamp, window)
+
+
+def count_recent(events: deque, timestamp: float, window: float) -> int:
+    """Descarta pela esquerda os timestamps fora da janela e retorna quantos restam."""
+    while events and timestamp - events[0] > window:
+        events.popleft()
+    return len(events)
+
+
+def iou(a: Box, b: Box) -> float:
+    """Intersection over Union de dois retângulos (left, top, right, bottom)."""
+    inter_w = min(a[2], b[2]) - max(a[0], b[0])
+    inter_h = min(a[3], b[3]) - max(a[1], b[1])
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _centroid_distance(a: Box, b: Box) -> float:
+    dx = (a[0] + a[2]) - (b[0] + b[2])
+    dy = (a[1] + a[3]) - (b[1] + b[3])
+    return 0.5 * (dx * dx + dy * dy) ** 0.5
+
+
+class FaceTracker:
+    """Atribui IDs estáveis aos rostos entre frames.
+
+    A associação é gulosa por IoU; rostos sem sobreposição suficiente ainda
+    podem casar pelo centróide (movimentos rápidos). Trilhas não vistas há
+    mais de 'max_age' segundos saem de 'tracks' e ficam em 'lost' por mais
+    'lost_retention' segundos: um rosto que reaparece perto de onde sumiu
+    (ex.: cabeça caída por alguns segundos) recupera a trilha antiga, com o
+    mesmo ID e a mesma janela de eventos.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_centroid_ratio: float = 0.5, max_age: float = 5.0,
+                 lost_retention: float = 30.0, reid_ratio: float = 1.0):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_ratio = max_centroid_ratio
+        self.max_age = max_age
+        self.lost_retention = lost_retention
+        self.reid_ratio = reid_ratio
+        self.tracks: List[FaceTrack] = []
+        self.lost: List[FaceTrack] = []
+        self._next_id = 1
+
+    def update(self, boxes: Sequence[Box], timestamp: float) -> List[FaceTrack]:
+        """Associa os retângulos do frame às trilhas; retorna uma trilha por retângulo, na mesma ordem."""
+        assigned: List[Optional[FaceTrack]] = [None] * len(boxes)
+        free_tracks = set(range(len(self.tracks)))
+
+        # Pares (IoU, retângulo, trilha) em ordem decrescente de sobreposição
+        pairs = sorted(
+            ((iou(box, track.box), i, j)
+             for i, box in enumerate(boxes) for j, track in enumerate(self.tracks)),
+            reverse=True,
+        )
+        for score, i, j in pairs:
+            if score < self.iou_threshold:
+                break
+            if assigned[i] is None and j in free_tracks:
+                assigned[i] = self.tracks[j]
+                free_tracks.discard(j)
+
+        for i, box in enumerate(boxes):
+            if assigned[i] is not None:
+                continue
+            # Sem sobreposição: tenta a trilha livre de centróide mais próximo
+            max_distance = self.max_centroid_ratio * (box[2] - box[0])
+            best = min(free_tracks, key=lambda j: _centroid_distance(box, self.tracks[j].box), default=None)
+            if best is not None and _centroid_distance(box, self.tracks[best].box) <= max_distance:
+                assigned[i] = self.tracks[best]
+                free_tracks.discard(best)
+            else:
+                assigned[i] = self._revive(box) or self._new_track(box, timestamp)
+
+        for track, box in zip(assigned, boxes):
+            track.box = box
+            track.last_seen = timestamp
+
+        # Trilhas antigas passam para 'lost'; as perdidas há muito tempo são descartadas
+        expired = [t for t in self.tracks if timestamp - t.last_seen > self.max_age]
+        if expired:
+            self.tracks = [t for t in self.tracks if timestamp - t.last_seen <= self.max_age]
+            self.lost.extend(expired)
+        if self.lost:
+            self.lost = [t for t in self.lost if timestamp - t.last_seen <= self.max_age + self.lost_retention]
+        return assigned
+
+    def _new_track(self, box: Box, timestamp: float) -> FaceTrack:
+        track = FaceTrack(self._next_id, box, timestamp)
+        self._next_id += 1
+        self.tracks.append(track)
+        return track
+
+    def _revive(self, box: Box) -> Optional[FaceTrack]:
+        """Recupera a trilha perdida mais próxima do retângulo, se houver uma perto o bastante."""
+        max_distance = self.reid_ratio * (box[2] - box[0])
+        best = min(self.lost, key=lambda track: _centroid_distance(box, track.box), default=None)
+        if best is None or _centroid_distance(box, best.box) > max_distance:
+            return None
+        self.lost.remove(best)
+        # Os temporizadores recomeçam: o rosto não foi observado no intervalo
+        best.eye_closed_start_time = None
+        best.mouth_open_start_time = None
+        self.tracks.append(best)
+        return best
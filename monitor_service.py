@@ -0,0 +1,244 @@
+"""Serviço de monitoramento de várias câmeras/motoristas ao mesmo tempo, sem interface gráfica.
+
+Cada fonte (índice de câmera, arquivo de vídeo ou URL RTSP) tem seu próprio
+Calibrator, EventLogger e estado por rosto; a inferência roda num pool de
+threads compartilhado, dimensionado pelos núcleos. Cada thread do pool tem
+o seu detector HOG (o do dlib não aceita chamadas concorrentes) e só o
+modelo de landmarks é carregado uma única vez.
+
+Exemplo:
+    python monitor_service.py 0 1 rtsp://10.0.0.5/cabine3 --dashboard
+"""
+import argparse
+import datetime
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from modules.analyzer.drowsiness_monitor import DrowsinessMonitor
+from modules.analyzer.event_logger import EventLogger
+from modules.calibrator.calibrator import Calibrator
+from modules.calibrator.offline_calibration import load_cached_thresholds
+from modules.detector.face_detector import FaceDetector
+from modules.detector.model_registry import get_face_detector
+from modules.pipeline.pipeline import CaptureStage, FrameQueue, StageStats, register_queue_metrics
+from modules.storage.frame_recorder import RECORDINGS_DIR, FrameRecorder
+from modules.telemetry.telemetry import telemetry
+from utils.alert_dispatcher import ALERT_DROWSY, ALERT_EYES, AlertDispatcher, LogOutput, WebhookOutput
+
+
+class PacedCapture:
+    """Lê um arquivo de vídeo no ritmo do seu FPS, simulando uma câmera ao vivo."""
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.interval = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30.0)
+        self._next_read = None
+
+    def read(self):
+        now = time.monotonic()
+        if self._next_read is not None and now < self._next_read:
+            time.sleep(self._next_read - now)
+        self._next_read = max(now, self._next_read or now) + self.interval
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+def open_source(source, realtime=True):
+    """Abre uma câmera (índice), arquivo ou URL; arquivos são lidos em tempo real por padrão."""
+    if source.isdigit():
+        return cv2.VideoCapture(int(source))
+    cap = cv2.VideoCapture(source)
+    if realtime and os.path.isfile(source):
+        return PacedCapture(cap)
+    return cap
+
+
+class StreamMonitor(threading.Thread):
+    """Monitora uma fonte de vídeo: captura própria, calibração, eventos e alertas.
+
+    Cada fluxo tem no máximo um frame em inferência por vez, então o estado
+    de rastreamento do seu FaceDetector nunca é compartilhado entre threads.
+    """
+
+    def __init__(self, name, source, face_detector, pool, session_prefix,
+                 thresholds=None, realtime=True, record=False, alert_webhook=None, driver_id=None):
+        super().__init__(name=f"stream-{name}", daemon=True)
+        self.stream_name = name
+        self.session_id = f"{session_prefix}_{name}"
+        self.face_detector = face_detector
+        self.pool = pool
+        self.thresholds = thresholds
+        self.driver_id = driver_id
+        self.cap = open_source(source, realtime)
+        self.frame_queue = FrameQueue(2)
+        self.capture = CaptureStage(self.cap, self.frame_queue, name)
+        self.calibrator = Calibrator()
+        self.event_logger = None
+        self.monitor = None
+        self.record = record
+        self.recorder = None
+        self.stats = StageStats("inference", name)
+        # Métricas rotuladas por fluxo: mostram em /metrics qual cabine está atrasada
+        register_queue_metrics(name, "frames", self.frame_queue)
+        self.latency_stats = StageStats("end_to_end", name)
+        self.fps = telemetry.fps_meter(stream=name)
+        self._at_risk = False
+        self._stop_event = threading.Event()
+        # Alertas entregues por uma thread própria (log e, opcionalmente, webhook da central)
+        outputs = [LogOutput(f"[{name}] ")]
+        if alert_webhook:
+            outputs.append(WebhookOutput(alert_webhook, source=self.session_id))
+        self.alerts = AlertDispatcher(outputs, stream=name)
+
+    def log(self, message):
+        print(f"[{self.stream_name}] {message}")
+
+    def run(self):
+        self.capture.start()
+        if self.thresholds:
+            self._start_monitoring(*self.thresholds)
+        else:
+            self.log(f"Calibrando - {self.calibrator.get_instructions()}")
+
+        while not self._stop_event.is_set():
+            packet = self.frame_queue.get(timeout=0.1)
+            if packet is None:
+                if self.frame_queue.closed:
+                    break
+                continue
+
+            start = time.perf_counter()
+            measurements = self.pool.submit(self.face_detector.analyze, packet.frame).result()
+            self.stats.record(time.perf_counter() - start)
+
+            if self.monitor is None:
+                self._calibrate(measurements)
+            else:
+                self._monitor(packet.index, packet.timestamp, measurements)
+            self.latency_stats.record(time.time() - packet.timestamp)
+            self.fps.tick()
+
+        self.capture.stop()
+        self.capture.join(1.0)
+        self.cap.release()
+        if self.event_logger is not None:
+            self.event_logger.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        self.alerts.close()
+        self.log(f"Encerrado ({self.stats.snapshot()['count']} frames, {self.frame_queue.dropped} descartados)")
+
+    def _calibrate(self, measurements):
+        phase = self.calibrator.current_phase
+        self.calibrator.update_phase()
+        if self.calibrator.calibration_done:
+            self._start_monitoring(*self.calibrator.calculate_thresholds())
+            return
+        if self.calibrator.current_phase != phase:
+            self.log(f"Calibrando - {self.calibrator.get_instructions()}")
+
+        if len(measurements) == 1:
+            ear = self.face_detector.calculate_ear(measurements[0].points, self.face_detector.LEFT_EYE_POINTS)
+            self.calibrator.add_sample(ear, measurements[0].mar)
+
+    def _start_monitoring(self, ear_threshold, mar_threshold):
+        self.event_logger = EventLogger(self.session_id, ear_threshold, mar_threshold)
+        self.monitor = DrowsinessMonitor(self.event_logger)
+        if self.record:
+            # Com o driver_id a gravação entra na calibração offline desse motorista
+            self.recorder = FrameRecorder(os.path.join(RECORDINGS_DIR, self.session_id), self.session_id,
+                                          driver_id=self.driver_id, ear_threshold=ear_threshold,
+                                          mar_threshold=mar_threshold)
+        self.log(f"Sessão {self.session_id} - Limiares EAR: {ear_threshold:.2f}, MAR: {mar_threshold:.2f}")
+
+    def _monitor(self, frame_index, timestamp, measurements):
+        tracked = self.monitor.process(measurements, timestamp)
+        if self.recorder is not None:
+            self.recorder.record_frame(frame_index, timestamp, measurements,
+                                       [track.track_id for _, track, _ in tracked])
+        for _, track, triggered in tracked:
+            for event_type in triggered:
+                alert = "ALERTA: OLHOS FECHADOS!" if event_type == ALERT_EYES else "BOCEJO DETECTADO!"
+                self.alerts.trigger(event_type, f"{alert} (rosto {track.track_id})")
+
+        at_risk = self.monitor.is_at_risk(timestamp)
+        if at_risk and not self._at_risk:
+            self.alerts.trigger(ALERT_DROWSY, "ALERTA: MOTORISTA SONOLENTO")
+        elif not at_risk and self._at_risk:
+            self.alerts.stop()
+        self._at_risk = at_risk
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitoramento de sonolência de várias câmeras ao mesmo tempo.")
+    parser.add_argument("sources", nargs="+", help="Índices de câmera, arquivos de vídeo ou URLs RTSP")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Threads de inferência compartilhadas (padrão: número de núcleos)")
+    parser.add_argument("--ear-threshold", type=float, default=None,
+                        help="Limiar EAR fixo (junto com --mar-threshold pula a calibração)")
+    parser.add_argument("--mar-threshold", type=float, default=None)
+    parser.add_argument("--drivers", nargs="+", default=None,
+                        help="ID do motorista de cada fonte, na mesma ordem; usa a calibração offline em cache")
+    parser.add_argument("--no-realtime", action="store_true",
+                        help="Lê arquivos o mais rápido possível em vez de no ritmo do vídeo")
+    parser.add_argument("--dashboard", action="store_true",
+                        help="Inicia o dashboard na porta 5000 (métricas em /metrics)")
+    parser.add_argument("--no-metrics", action="store_true", help="Desliga a telemetria")
+    parser.add_argument("--record", action="store_true",
+                        help="Grava as medidas de cada frame em reports/recordings/<sessão>")
+    parser.add_argument("--alert-webhook", default=None, help="URL que recebe cada alerta via HTTP POST")
+    args = parser.parse_args()
+    telemetry.enabled = not args.no_metrics
+
+    thresholds = None
+    if args.ear_threshold is not None and args.mar_threshold is not None:
+        thresholds = (args.ear_threshold, args.mar_threshold)
+
+    # Ensure reports directory exists
+    os.makedirs("reports", exist_ok=True)
+    session_prefix = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    face_detector = FaceDetector() # preditor de landmarks carregado uma vez para todos os fluxos
+    # Cada thread de inferência cria o seu detector HOG ao iniciar
+    pool = ThreadPoolExecutor(max_workers=args.workers or os.cpu_count(), thread_name_prefix="inference",
+                              initializer=get_face_detector)
+    drivers = args.drivers or []
+    streams = [
+        StreamMonitor(f"cam{i}", source, face_detector.share(), pool, session_prefix,
+                      thresholds or (load_cached_thresholds(drivers[i]) if i < len(drivers) else None),
+                      realtime=not args.no_realtime, record=args.record, alert_webhook=args.alert_webhook,
+                      driver_id=drivers[i] if i < len(drivers) else None)
+        for i, source in enumerate(args.sources)
+    ]
+
+    if args.dashboard:
+        import dashboard_server
+        dashboard_thread = threading.Thread(target=dashboard_server.run_dashboard_server,
+                                            args=(streams[0].session_id,), daemon=True)
+        dashboard_thread.start()
+        print("Dashboard server started at http://127.0.0.1:5000")
+
+    for stream in streams:
+        stream.start()
+    try:
+        while any(stream.is_alive() for stream in streams):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        for stream in streams:
+            stream.stop()
+        for stream in streams:
+            stream.join()
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
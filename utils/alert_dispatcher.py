@@ -0,0 +1,201 @@
+import atexit
+import itertools
+import json
+import queue
+import threading
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+from modules.telemetry.telemetry import telemetry
+
+# Tipos de alerta e prioridades (maior = mais urgente)
+ALERT_YAWN = "bocejo"
+ALERT_EYES = "olhos"
+ALERT_DROWSY = "sonolento"
+ALERT_PRIORITIES = {ALERT_YAWN: 1, ALERT_EYES: 2, ALERT_DROWSY: 3}
+
+
+class AlertOutput:
+    """Destino de alertas. Roda só na thread do AlertDispatcher, então pode bloquear."""
+
+    def alert(self, kind: str, message: str, priority: int):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class NullOutput(AlertOutput):
+    """Descarta os alertas (servidores sem som nem destino configurado)."""
+
+    def alert(self, kind, message, priority):
+        pass
+
+
+class LogOutput(AlertOutput):
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+
+    def alert(self, kind, message, priority):
+        print(f"{self.prefix}{message}")
+
+
+class SoundOutput(AlertOutput):
+    """Toca o som de alerta com o pygame, carregado no primeiro alerta (na thread do dispatcher).
+
+    Um alerta de prioridade maior interrompe o som de um menos urgente. Sem
+    pygame ou sem dispositivo de áudio a saída se desativa com um aviso.
+    """
+
+    def __init__(self, sound_path: str = "assets/alert.wav"):
+        self.sound_path = sound_path
+        self._mixer = None
+        self._sound = None
+        self._disabled = False
+        self._playing_priority = 0
+
+    def _load(self):
+        try:
+            import pygame
+            pygame.mixer.init()
+            self._mixer = pygame.mixer
+            self._sound = self._mixer.Sound(self.sound_path)
+        except Exception as e:
+            print(f"Alerta sonoro desativado: {e}")
+            self._disabled = True
+
+    def alert(self, kind, message, priority):
+        if self._mixer is None and not self._disabled:
+            self._load()
+        if self._disabled:
+            return
+        if self._mixer.get_busy():
+            if priority <= self._playing_priority:
+                return
+            self._mixer.stop()
+        self._sound.play()
+        self._playing_priority = priority
+
+    def stop(self):
+        if self._mixer is not None and self._mixer.get_busy():
+            self._mixer.stop()
+        self._playing_priority = 0
+
+    def close(self):
+        if self._mixer is not None:
+            self._mixer.quit()
+            self._mixer = None
+
+
+class WebhookOutput(AlertOutput):
+    """Envia cada alerta como JSON via HTTP POST (ex.: central de frota)."""
+
+    def __init__(self, url: str, timeout: float = 2.0, source: Optional[str] = None):
+        self.url = url
+        self.timeout = timeout
+        self.source = source
+
+    def alert(self, kind, message, priority):
+        payload = json.dumps({"kind": kind, "message": message, "priority": priority,
+                              "source": self.source, "timestamp": time.time()}).encode()
+        request = urllib.request.Request(self.url, data=payload, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class AlertDispatcher:
+    """Entrega alertas às saídas numa thread própria, fora do loop de frames.
+
+    'trigger' e 'stop' só fazem uma comparação e, quando necessário, colocam
+    um comando numa fila de prioridade: o loop de frames nunca espera por
+    som, rede ou disco. Um mesmo tipo de alerta é repassado no máximo uma vez
+    a cada 'cooldown' segundos, mesmo com 'stop' no meio (o loop de frames
+    chama 'stop' a cada frame sem risco), e 'stop' só é enfileirado se houver
+    alerta ativo. Comandos pendentes saem por prioridade (sonolento > olhos >
+    bocejo); um 'stop' não interrompe alertas solicitados depois dele.
+    'stream' rotula as métricas em /metrics, uma série por fluxo.
+    """
+
+    _STOP = 0 # prioridade do comando de parada: depois de qualquer alerta pendente
+    _CLOSE = object()
+
+    def __init__(self, outputs: Optional[List[AlertOutput]] = None, cooldown: float = 1.0, stream: str = "main"):
+        self.outputs = outputs if outputs is not None else [NullOutput()]
+        self.cooldown = cooldown
+        self.active = False
+        self._last_sent: Dict[str, float] = {}
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._sequence = itertools.count() # ordem de chegada: desempate e validade do 'stop'
+        self._last_alert_sequence = -1
+        self._closed = False
+        self._dispatched = {kind: telemetry.counter("alerts_dispatched_total", "Alertas entregues às saídas",
+                                                    stream=stream, kind=kind)
+                            for kind in ALERT_PRIORITIES}
+        self._debounced = telemetry.counter("alerts_debounced_total", "Alertas suprimidos pelo intervalo mínimo",
+                                            stream=stream)
+        self._delay = telemetry.histogram("alert_dispatch_delay_seconds", "Tempo entre o disparo e a entrega",
+                                          stream=stream)
+        self._errors = telemetry.counter("alert_output_errors_total", "Falhas nas saídas de alerta", stream=stream)
+        telemetry.gauge("alert_queue_depth", "Comandos de alerta pendentes", fn=self._queue.qsize, stream=stream)
+        self._thread = threading.Thread(target=self._run, name=f"alert-dispatcher-{stream}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def trigger(self, kind: str, message: str = "") -> bool:
+        """Solicita um alerta; retorna False se ele foi suprimido pelo intervalo mínimo."""
+        now = time.monotonic()
+        last = self._last_sent.get(kind)
+        if last is not None and now - last < self.cooldown:
+            self._debounced.inc()
+            return False
+        self._last_sent[kind] = now
+        self.active = True
+        priority = ALERT_PRIORITIES.get(kind, 1)
+        self._queue.put((-priority, next(self._sequence), ("alert", kind, message, priority, now)))
+        return True
+
+    def stop(self):
+        """Encerra os alertas ativos; sem alerta ativo não faz nada."""
+        if not self.active:
+            return
+        self.active = False
+        sequence = next(self._sequence)
+        self._queue.put((-self._STOP, sequence, ("stop", sequence)))
+
+    def _run(self):
+        while True:
+            _, sequence, command = self._queue.get()
+            if command is self._CLOSE:
+                break
+            if command[0] == "alert":
+                _, kind, message, priority, requested_at = command
+                self._delay.observe(time.monotonic() - requested_at)
+                self._call("alert", kind, message, priority)
+                self._last_alert_sequence = max(self._last_alert_sequence, sequence)
+                if kind in self._dispatched:
+                    self._dispatched[kind].inc()
+            elif self._last_alert_sequence < command[1]:
+                self._call("stop")
+        self._call("close")
+
+    def _call(self, method, *args):
+        for output in self.outputs:
+            try:
+                getattr(output, method)(*args)
+            except Exception as e:
+                # Uma saída com defeito (rede, áudio) não derruba as demais nem a thread
+                self._errors.inc()
+                print(f"Erro na saída de alerta {type(output).__name__}: {e}")
+
+    def close(self):
+        """Entrega os comandos pendentes e encerra a thread (também chamado na saída do processo)."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put((float("inf"), next(self._sequence), self._CLOSE))
+        self._thread.join()
+        atexit.unregister(self.close)
@@ -1,26 +1,35 @@
-import pygame
 import time
 import cv2
+from modules.telemetry.telemetry import telemetry
+from utils.alert_dispatcher import ALERT_DROWSY, AlertDispatcher, SoundOutput
 
 class AlertManager:
-    def __init__(self, sound_path="assets/alert.wav"):
-        pygame.init()
-        self.alarm_sound = pygame.mixer.Sound(sound_path)
+    def __init__(self, sound_path="assets/alert.wav", outputs=None, dispatcher=None):
+        # O som (e o pygame) fica com o AlertDispatcher, numa thread própria:
+        # aqui só se desenha no frame e se enfileira o comando
+        self.dispatcher = dispatcher or AlertDispatcher(outputs if outputs is not None else [SoundOutput(sound_path)])
         self.last_alert_time = None
         self.ALARM_DURATION = 1.0
+        self._alerts = telemetry.counter("alerts_total", "Alertas disparados")
+        self._alert_latency = telemetry.histogram("alert_latency_seconds", "Tempo gasto em trigger_alert")
 
-    def trigger_alert(self, frame, text, position, color=(0, 0, 255)):
-        """Exibe alerta visual e toca som."""
+    def trigger_alert(self, frame, text, position, color=(0, 0, 255), kind=ALERT_DROWSY):
+        """Exibe alerta visual e solicita o alerta sonoro (sem bloquear o loop de frames)."""
+        start = time.perf_counter()
         cv2.putText(frame, text, position, cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-        if not pygame.mixer.get_busy():
-            self.alarm_sound.play()
+        self.dispatcher.trigger(kind, text)
         self.last_alert_time = time.time()
+        self._alerts.inc()
+        self._alert_latency.observe(time.perf_counter() - start)
 
     def stop_alert(self):
-        """Para o alerta sonoro."""
-        if pygame.mixer.get_busy():
-            pygame.mixer.stop()
+        """Para o alerta sonoro, passado o período de persistência do último alerta."""
+        if not self.is_alert_active():
+            self.dispatcher.stop()
 
     def is_alert_active(self):
         """Verifica se o alerta ainda está no período de persistência."""
-        return self.last_alert_time and (time.time() - self.last_alert_time) < self.ALARM_DURATION
\ No newline at end of file
+        return self.last_alert_time and (time.time() - self.last_alert_time) < self.ALARM_DURATION
+
+    def close(self):
+        self.dispatcher.close()